@@ -0,0 +1,35 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simple_parser import parse  # noqa: E402
+from simple_parser.evaluator import compile_tree, environment, evaluate  # noqa: E402
+
+EXPRESSIONS = [
+    'a * b + c;',
+    '(a + b) * (c - d) / (e + 1) - f * 3;',
+    'a = b * 2 + c; a * a - b;',
+]
+
+
+def main(runs):
+    print('{:40} {:>10} {:>10} {:>10} {:>8}'.format('expression', 'runs', 'walk s', 'compiled s', 'speedup'))
+    for text in EXPRESSIONS:
+        tree = parse(text)
+        env = environment(a=3, b=4, c=5, d=6, e=7, f=8)
+        start = time.perf_counter()
+        for _ in range(runs):
+            evaluate(tree, env)
+        walk = time.perf_counter() - start
+        start = time.perf_counter()
+        function = compile_tree(tree)
+        for _ in range(runs):
+            function(env)
+        compiled = time.perf_counter() - start
+        print('{:40} {:>10} {:>10.4f} {:>10.4f} {:>8.1f}'.format(text, runs, walk, compiled, walk / compiled))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 5)
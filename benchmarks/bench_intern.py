@@ -0,0 +1,77 @@
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simple_parser import Interner, Lexer, Parser, TokenLexer, simplify  # noqa: E402
+from simple_parser.evaluator import environment, evaluate, evaluate_shared  # noqa: E402
+
+SAMPLE = '1 + 2 * (4 - 4) + 6 * (1 + 9) + 2 * (12 + 8 + 9 + 6) / 4 * 9 - 4 + 5 / 9 * 2 * (1 + 2 / 5);'
+PIECES = ['(1 + 2 / 5)', '(a * b - c)', '(12 + 8 + 9 + 6)', '(x / (y + 1))', 'a', 'b', '4', '9']
+
+
+def generated(statements, depth, seed=0):
+    rng = random.Random(seed)
+
+    def expr(d):
+        if d == 0 or rng.random() < 0.2:
+            return rng.choice(PIECES)
+        return '({} {} {})'.format(expr(d - 1), rng.choice('+-*'), expr(d - 1))
+    return ' '.join(expr(depth) + ';' for _ in range(statements))
+
+
+def count(root):
+    nodes = 0
+    seen = set()
+    stack = [root]
+    while stack:
+        n = stack.pop()
+        if n is not None:
+            nodes += 1
+            if n not in seen:
+                seen.add(n)
+                stack.append(n.left)
+                stack.append(n.right)
+    return nodes, len(seen)
+
+
+def measure(text, store):
+    tokens = Lexer(text).tokenize()
+    tracemalloc.start()
+    start = time.perf_counter()
+    tree = Parser(TokenLexer(tokens), store).parse()
+    elapsed = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return tree, elapsed, size
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def main(statements):
+    inputs = [
+        ('sample x{}'.format(statements), SAMPLE * statements),
+        ('generated {}'.format(statements), generated(statements, 6)),
+    ]
+    print('{:18} {:>9} {:>9} {:>11} {:>11} {:>9} {:>9} {:>10} {:>10}'.format(
+        'input', 'nodes', 'distinct', 'tree KiB', 'dag KiB', 'eval s', 'shared s', 'simplify s', 'dag s'))
+    for name, text in inputs:
+        tree, _, tree_bytes = measure(text, None)
+        dag, _, dag_bytes = measure(text, Interner())
+        nodes, _ = count(tree)
+        _, distinct = count(dag)
+        print('{:18} {:>9} {:>9} {:>11.0f} {:>11.0f} {:>9.3f} {:>9.3f} {:>10.3f} {:>10.3f}'.format(
+            name, nodes, distinct, tree_bytes / 1024, dag_bytes / 1024,
+            timed(evaluate, tree, environment(a=3, b=5, c=2, x=7, y=1)),
+            timed(evaluate_shared, dag, environment(a=3, b=5, c=2, x=7, y=1)), timed(simplify, tree), timed(simplify, dag)))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 4)
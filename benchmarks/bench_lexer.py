@@ -0,0 +1,46 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from generators import SHAPES  # noqa: E402
+from simple_parser import Lexer  # noqa: E402
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+# the token at a time loop Parser runs on a Lexer
+def next_tok_loop(text):
+    lexer = Lexer(text)
+    count = 0
+    lexer.next_tok()
+    while lexer.sym != Lexer.EOF:
+        count += 1
+        lexer.next_tok()
+    return count
+
+
+def tokenized(text):
+    return len(Lexer(text).tokenize()) - 1
+
+
+# lexing only, no parsing, from 10^3 tokens up to 10^max_exponent
+def main(max_exponent):
+    print('{:9} {:>9} {:>14} {:>13} {:>8}'.format('shape', 'tokens', 'next_tok s', 'tokenize s', 'speedup'))
+    for shape in ('mixed', 'balanced', 'sets'):
+        for exponent in range(3, max_exponent + 1):
+            text = SHAPES[shape](10 ** exponent)
+            count, a = timed(next_tok_loop, text)
+            tokens, b = timed(tokenized, text)
+            assert tokens == count, (shape, tokens, count)
+            print('{:9} {:>9} {:>14.4f} {:>13.4f} {:>8.2f}'.format(shape, count, a, b, a / b))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 7)
@@ -0,0 +1,35 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simple_parser import parse, minimize_tree, count_height  # noqa: E402
+
+SHAPES = {
+    'add': '+',
+    'sub': '-',
+    'mul': '*',
+    'div': '/',
+    'add/sub': '+-',
+}
+
+
+def chain(ops, n):
+    return '1' + ''.join(ops[i % len(ops)] + str(i % 97 + 2) for i in range(n - 1)) + ';'
+
+
+def main(sizes):
+    print('{:8} {:>8} {:>10} {:>10} {:>12}'.format('shape', 'terms', 'height', 'seconds', 'us/term'))
+    for n in sizes:
+        for name, ops in SHAPES.items():
+            tree = parse(chain(ops, n))
+            start = time.perf_counter()
+            tree = minimize_tree(tree)
+            elapsed = time.perf_counter() - start
+            print('{:8} {:>8} {:>10} {:>10.4f} {:>12.2f}'.format(
+                name, n, count_height(tree), elapsed, elapsed / n * 1e6))
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6])
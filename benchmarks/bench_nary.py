@@ -0,0 +1,37 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from generators import SHAPES  # noqa: E402
+from simple_parser import count_height, minimize_tree, parse, same_tree  # noqa: E402
+from simple_parser.nary import balance, factor_gcd, flatten  # noqa: E402
+
+
+def timed(function, *args):
+    best = None
+    for _ in range(3):
+        start = time.perf_counter()
+        result = function(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main(size):
+    print('{:9} {:>10} {:>8} {:>10} {:>8} {:>11} {:>11}'.format(
+        'shape', 'minimize s', 'height', 'balance s', 'height', 'same_tree s', 'n-ary gcd s'))
+    for shape in ('add', 'sub', 'mixed', 'div', 'nested', 'balanced', 'sets'):
+        tree = parse(SHAPES[shape](size))
+        a, minimized = timed(minimize_tree, tree)
+        b, balanced = timed(balance, tree)
+        c, _ = timed(same_tree, tree)
+        d, _ = timed(lambda node: factor_gcd(flatten(node)), tree)
+        print('{:9} {:>10.4f} {:>8} {:>10.4f} {:>8} {:>11.4f} {:>11.4f}'.format(
+            shape, a, count_height(minimized), b, count_height(balanced), c, d))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 5)
@@ -0,0 +1,55 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from generators import SHAPES  # noqa: E402
+from simple_parser import optimize, parse, same_tree, set_height, set_parent  # noqa: E402
+from simple_parser.passes import FactorGcd, Heights, Minimize, ParentLinks, PassManager, Simplify  # noqa: E402
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def annotate_chained(tree):
+    set_height(tree)
+    set_parent(tree)
+
+
+def factor_chained(tree):
+    set_height(same_tree(tree))
+
+
+def optimize_chained(tree):
+    set_height(optimize(tree))
+
+
+# parent links only go on a tree no pass has rewritten (PassManager refuses them after
+# one), so the rewriting pipelines end with heights
+PIPELINES = [
+    ('heights, parents', annotate_chained, 2, [Heights, ParentLinks]),
+    ('factor, heights', factor_chained, 2, [FactorGcd, Heights]),
+    ('optimize, heights', optimize_chained, 6, [Simplify, Minimize, FactorGcd, Heights]),
+]
+
+
+def main(size):
+    print('{:9} {:28} {:>6} {:>10} {:>6} {:>10} {:>8}'.format(
+        'shape', 'pipeline', 'walks', 'chained s', 'walks', 'fused s', 'speedup'))
+    for shape in ('mixed', 'balanced', 'sets'):
+        tree = parse(SHAPES[shape](size))
+        for name, chained, walks, passes in PIPELINES:
+            manager = PassManager([p() for p in passes])
+            a = min(timed(chained, tree) for _ in range(3))
+            b = min(timed(manager.run, tree) for _ in range(3))
+            print('{:9} {:28} {:>6} {:>10.4f} {:>6} {:>10.4f} {:>8.2f}'.format(
+                shape, name, walks, a, len(manager.plan()), b, a / b))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 5)
@@ -0,0 +1,56 @@
+import os
+import pickle
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simple_parser import iter_statements, minimize_tree, parse  # noqa: E402
+from simple_parser.serialize import dumps, loads  # noqa: E402
+
+SAMPLE = '1 + 2 * (4 - 4) + 6 * (1 + 9) + 2 * (12 + 8 + 9 + 6) / 4 * 9 - 4 + 5 / 9 * 2 * (1 + 2 / 5);'
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def dumps_all(trees):
+    return [dumps(tree) for tree in trees]
+
+
+def loads_all(blobs):
+    return [loads(blob) for blob in blobs]
+
+
+def pickled(trees):
+    try:
+        data, dump_time = timed(pickle.dumps, trees, pickle.HIGHEST_PROTOCOL)
+        _, load_time = timed(pickle.loads, data)
+    except RecursionError:
+        return 'too deep', '', ''
+    return len(data), '{:.4f}'.format(dump_time), '{:.4f}'.format(load_time)
+
+
+def main(n):
+    chain = '+'.join('a*{}'.format(i) for i in range(n)) + ';'
+    inputs = [
+        ('sample statements', SAMPLE * (n // 40), lambda text: list(iter_statements(text))),
+        ('sample program', SAMPLE * (n // 40), lambda text: [parse(text)]),
+        ('chain', chain, lambda text: [parse(text)]),
+        ('minimized chain', chain, lambda text: [minimize_tree(parse(text))]),
+    ]
+    print('{:18} {:>9} {:>9} {:>9} {:>9} {:>9} {:>9} {:>9} {:>9}'.format(
+        'input', 'text B', 'parse s', 'tree B', 'dumps s', 'loads s', 'pickle B', 'pdump s', 'pload s'))
+    for name, text, build in inputs:
+        trees, parse_time = timed(build, text)
+        blobs, dump_time = timed(dumps_all, trees)
+        _, load_time = timed(loads_all, blobs)
+        print('{:18} {:>9} {:>9.4f} {:>9} {:>9.4f} {:>9.4f} {:>9} {:>9} {:>9}'.format(
+            name, len(text), parse_time, sum(map(len, blobs)), dump_time, load_time, *pickled(trees)))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 5)
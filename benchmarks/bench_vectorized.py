@@ -0,0 +1,53 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+from simple_parser import parse  # noqa: E402
+from simple_parser.evaluator import VARIABLES, compile_tree, evaluate, evaluate_columns  # noqa: E402
+
+EXPRESSIONS = [
+    'a * b + c;',
+    '(a + b) * (c - d) / (e + 1) - f * 3;',
+]
+
+
+def rows(columns, size):
+    names = sorted(columns)
+    lists = [columns[name].tolist() for name in names]
+    indices = [ord(name) - ord('a') for name in names]
+    env = [0] * VARIABLES
+    for i in range(size):
+        for index, values in zip(indices, lists):
+            env[index] = values[i]
+        yield env
+
+
+def main(sizes):
+    rng = np.random.default_rng(0)
+    print('{:40} {:>9} {:>14} {:>14} {:>14}'.format('expression', 'rows', 'columns r/s', 'compiled r/s', 'walk r/s'))
+    for text in EXPRESSIONS:
+        tree = parse(text)
+        function = compile_tree(tree)
+        for size in sizes:
+            columns = {name: rng.integers(1, 1000, size) for name in 'abcdef'}
+            start = time.perf_counter()
+            evaluate_columns(tree, columns)
+            vectorized = time.perf_counter() - start
+            start = time.perf_counter()
+            for env in rows(columns, size):
+                function(env)
+            compiled = time.perf_counter() - start
+            start = time.perf_counter()
+            for env in rows(columns, size):
+                evaluate(tree, env)
+            walk = time.perf_counter() - start
+            print('{:40} {:>9} {:>14.0f} {:>14.0f} {:>14.0f}'.format(
+                text, size, size / vectorized, size / compiled, size / walk))
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [10 ** 4, 10 ** 5, 10 ** 6])
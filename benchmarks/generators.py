@@ -0,0 +1,71 @@
+import random
+import string
+
+# Each generator takes a target token count n (the trailing ';' included) and a seed and
+# returns one program text of roughly that many tokens. The same arguments always give
+# the same text, so timings from different revisions are comparable.
+
+NAMES = string.ascii_lowercase
+OPS = '+-*/'
+
+
+def chain(ops):
+    # left-leaning chain 1 op 2 op 3 ..., cycling through ops
+    def generate(n, seed=0):
+        terms = max(1, n // 2)
+        return '1' + ''.join(ops[i % len(ops)] + str(i % 97 + 2) for i in range(terms - 1)) + ';'
+    return generate
+
+
+def nested(n, seed=0):
+    # ((((1 + 2) * 3) - 4) / 5): parentheses nested n / 4 deep
+    rng = random.Random(seed)
+    depth = max(1, n // 4)
+    closes = ''.join('{}{})'.format(rng.choice(OPS), rng.randint(1, 99)) for _ in range(depth))
+    return '(' * depth + str(rng.randint(1, 99)) + closes + ';'
+
+
+def balanced(n, seed=0):
+    # a random tree of about n / 4 leaves, split evenly at every node and fully bracketed
+    rng = random.Random(seed)
+    leaves = max(1, n // 4)
+    out = []
+    stack = [leaves]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            out.append(item)
+        elif item == 1:
+            out.append(str(rng.randint(1, 99)) if rng.random() < 0.7 else rng.choice(NAMES))
+        else:
+            half = item // 2
+            stack.extend((')', item - half, rng.choice(OPS), half))
+            out.append('(')
+    return ''.join(out) + ';'
+
+
+def sets(n, seed=0):
+    # statements like a = b = c * d + e - f;, mostly variables and assignments
+    rng = random.Random(seed)
+    out = []
+    tokens = 0
+    while tokens < n:
+        targets = rng.randint(1, 3)
+        operands = rng.randint(1, 6)
+        terms = [rng.choice(NAMES) if rng.random() < 0.8 else str(rng.randint(1, 99)) for _ in range(operands)]
+        expr = terms[0] + ''.join(rng.choice(OPS) + term for term in terms[1:])
+        out.append(''.join(rng.choice(NAMES) + ' = ' for _ in range(targets)) + expr + ';')
+        tokens += 2 * targets + 2 * operands
+    return '\n'.join(out)
+
+
+SHAPES = {
+    'add': chain('+'),
+    'sub': chain('-'),
+    'mul': chain('*'),
+    'div': chain('/'),
+    'mixed': chain('+-*/'),
+    'nested': nested,
+    'balanced': balanced,
+    'sets': sets,
+}
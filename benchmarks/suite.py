@@ -0,0 +1,166 @@
+import argparse
+import contextlib
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from generators import SHAPES  # noqa: E402
+from simple_parser import (  # noqa: E402
+    Lexer, Parser, TokenLexer, copy, count_height, count_nodes, minimize_tree, same_tree,
+)
+from simple_parser.levels import print_tree  # noqa: E402
+from simple_parser.render import _build_tree_string  # noqa: E402
+
+SIZES = [10 ** k for k in range(1, 7)]
+RENDER_LIMIT = 5 * 10 ** 7
+PHASES = ['lex', 'parse', 'copy', 'minimize_tree', 'same_tree', 'build_tree_string', 'print_tree']
+
+
+# like timeit, the collector stays off while a phase runs so its pauses don't land on it
+def timed(function, *args):
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        result = function(*args)
+        return result, time.perf_counter() - start
+    finally:
+        gc.enable()
+
+
+def print_quietly(tree):
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        print_tree(tree)
+
+
+# Times every phase on the parsed tree; minimize_tree and same_tree build new nodes where
+# they change something and leave the shape of their input alone (minimize_tree only
+# fills in heights), so they need no copy of it. Each time is the best of `repeat`.
+# The rendered text grows with width times height, so trees whose node count times
+# height is over render_limit skip the two render phases (recorded as None).
+def measure(text, repeat, render_limit):
+    best = {}
+
+    def record(phase, seconds):
+        best[phase] = min(best.get(phase, seconds), seconds)
+    for _ in range(repeat):
+        tokens, seconds = timed(Lexer(text).tokenize)
+        record('lex', seconds)
+        tree, seconds = timed(Parser(TokenLexer(tokens)).parse)
+        record('parse', seconds)
+        _, seconds = timed(copy, tree)
+        record('copy', seconds)
+        minimized, seconds = timed(minimize_tree, tree)
+        record('minimize_tree', seconds)
+        _, seconds = timed(same_tree, tree)
+        record('same_tree', seconds)
+    nodes = count_nodes(tree)
+    height = count_height(tree)
+    for _ in range(repeat if nodes * height <= render_limit else 0):
+        record('build_tree_string', timed(_build_tree_string, tree, 0)[1])
+        record('print_tree', timed(print_quietly, tree)[1])
+    best.setdefault('build_tree_string', None)
+    best.setdefault('print_tree', None)
+    return {
+        'tokens': len(tokens),
+        'nodes': nodes,
+        'height': height,
+        'minimized_height': count_height(minimized),
+        'seconds': best,
+    }
+
+
+def revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(shapes, sizes, repeat, render_limit):
+    results = []
+    print('{:9} {:>8} {:>8} {:>8}'.format('shape', 'size', 'tokens', 'height') + ''.join(
+        ' {:>10}'.format(phase[:10]) for phase in PHASES))
+    for size in sizes:
+        for name in shapes:
+            result = dict(shape=name, size=size, **measure(SHAPES[name](size), repeat, render_limit))
+            results.append(result)
+            print('{:9} {:>8} {:>8} {:>8}'.format(name, size, result['tokens'], result['height']) + ''.join(
+                ' {:>10}'.format(_seconds(result['seconds'][phase])) for phase in PHASES))
+    return {
+        'revision': revision(),
+        'python': platform.python_version(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def _seconds(value):
+    return '-' if value is None else '{:.6f}'.format(value)
+
+
+# new / old time per phase for every shape and size the two runs share; ratios above
+# threshold are flagged. Times under min_time are too noisy to call either way.
+def compare(old, new, threshold=1.1, min_time=1e-4):
+    before = {(r['shape'], r['size']): r['seconds'] for r in old['results']}
+    regressions = 0
+    print('comparing {} -> {}'.format(old.get('revision'), new.get('revision')))
+    print('{:9} {:>8}'.format('shape', 'size') + ''.join(' {:>10}'.format(phase[:10]) for phase in PHASES))
+    for result in new['results']:
+        key = (result['shape'], result['size'])
+        if key not in before:
+            continue
+        cells = []
+        for phase in PHASES:
+            a = before[key].get(phase)
+            b = result['seconds'].get(phase)
+            if a is None or b is None:
+                cells.append('-')
+                continue
+            ratio = b / a if a else float('inf')
+            flag = ratio > threshold and max(a, b) >= min_time
+            regressions += flag
+            cells.append('{:.2f}x{}'.format(ratio, '!' if flag else ''))
+        print('{:9} {:>8}'.format(*key) + ''.join(' {:>10}'.format(cell) for cell in cells))
+    print('{} regression(s) over {:.0%}'.format(regressions, threshold - 1))
+    return regressions
+
+
+def main(argv=None):
+    args = argparse.ArgumentParser(description='Time each phase on generated expressions.')
+    args.add_argument('--shapes', nargs='+', choices=sorted(SHAPES), default=list(SHAPES))
+    args.add_argument('--sizes', nargs='+', type=int, default=SIZES, help='target token counts')
+    args.add_argument('--repeat', type=int, default=3, help='keep the best of this many rounds')
+    args.add_argument('--render-limit', type=int, default=RENDER_LIMIT,
+                      help='skip rendering trees whose nodes times height exceed this')
+    args.add_argument('-o', '--output', help='write the results as JSON')
+    args.add_argument('--baseline', help='compare this run against an earlier JSON result')
+    args.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='compare two JSON results and exit')
+    args.add_argument('--threshold', type=float, default=1.1, help='slowdown ratio counted as a regression')
+    args = args.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0]) as old, open(args.compare[1]) as new:
+            return 1 if compare(json.load(old), json.load(new), args.threshold) else 0
+    report = run(args.shapes, args.sizes, args.repeat, args.render_limit)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=1)
+    if args.baseline:
+        with open(args.baseline) as f:
+            return 1 if compare(json.load(f), report, args.threshold) else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
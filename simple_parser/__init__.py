@@ -0,0 +1,58 @@
+# The core (sources, lexer, trees, passes, Parser) is imported with the package. The
+# renderers, the level printer, stats, the evaluators, serialization, caching and
+# incremental parsing are exported lazily: each module loads when one of its names is
+# first used, and NumPy only when evaluate_columns runs.
+from .core import (  # noqa: F401
+    BufferSource, FileSource, Interner, Lexer, LexerError, Node, ParseError, Parser,
+    ParserError, StoreNode, StringSource, TokenLexer, Tokens, TreeStore, copy, count_height,
+    count_nodes, find_gcd, iter_statements, make_source, map_file, minimize_tree, optimize,
+    parse, perform, same_tree, set_height, set_parent, simplify,
+)
+
+_LAZY = {
+    'RENDER_MAX_NODES': 'render',
+    'render_tree': 'render',
+    'print_tree': 'levels',
+    'Stats': 'stats',
+    'VARIABLES': 'evaluator',
+    'compile_tree': 'evaluator',
+    'environment': 'evaluator',
+    'evaluate': 'evaluator',
+    'evaluate_columns': 'evaluator',
+    'evaluate_shared': 'evaluator',
+    'dump': 'serialize',
+    'dumps': 'serialize',
+    'load': 'serialize',
+    'loads': 'serialize',
+    'ParseCache': 'cache',
+    'IncrementalParser': 'incremental',
+    'Pass': 'passes',
+    'PassManager': 'passes',
+    'NaryNode': 'nary',
+    'balance': 'nary',
+    'factor_gcd': 'nary',
+    'flatten': 'nary',
+    'unflatten': 'nary',
+    'dedup': 'merkle',
+    'diff': 'merkle',
+    'fingerprint': 'merkle',
+    'tree_equal': 'merkle',
+    'Status': 'recognize',
+    'recognize': 'recognize',
+}
+
+__all__ = [name for name in globals() if not name.startswith('_')] + sorted(_LAZY)
+
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+    from importlib import import_module
+    value = getattr(import_module('.' + module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
@@ -0,0 +1,143 @@
+import argparse
+import base64
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice, tee
+
+from .core import ParseError, optimize, parse
+from .recognize import Status, recognize
+from .serialize import dumps
+
+CHUNK_SIZE = 256
+
+
+def process(text):
+    # (serialized optimized tree, None, None) or (None, error message, its offset); any
+    # other failure is reported for this text alone, so it cannot end a whole run
+    try:
+        return dumps(optimize(parse(text), inplace=True)), None, None
+    except ParseError as e:
+        return None, str(e), e.offset
+    except Exception as e:
+        return None, _internal(e), None
+
+
+def check_syntax(text):
+    try:
+        return recognize(text)
+    except Exception as e:
+        return Status(False, None, _internal(e))
+
+
+def _internal(e):
+    return 'internal: {}: {}'.format(type(e).__name__, e)
+
+
+def process_chunk(texts, check=False):
+    if check:
+        return [check_syntax(text) for text in texts]
+    return [process(text) for text in texts]
+
+
+def chunks(items, size):
+    items = iter(items)
+    chunk = list(islice(items, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(items, size))
+
+
+# Runs parse -> optimize over texts in worker processes and yields process() results in
+# input order. Texts travel in chunks, so pickling and queueing are paid per chunk rather
+# than per expression, and at most `backlog` chunks are in flight, so a corpus of any
+# size streams through in bounded memory. workers=0 runs everything in this process.
+# With check=True nothing is parsed and the results are recognize() statuses instead.
+def run(texts, workers=None, chunk_size=CHUNK_SIZE, backlog=None, check=False):
+    if workers == 0:
+        for text in texts:
+            yield check_syntax(text) if check else process(text)
+        return
+    workers = workers or os.cpu_count() or 1
+    backlog = backlog or 2 * workers
+    with ProcessPoolExecutor(workers) as pool:
+        pending = deque()
+        for chunk in chunks(texts, chunk_size):
+            pending.append(pool.submit(process_chunk, chunk, check))
+            if len(pending) >= backlog:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def read_texts(file, field=None):
+    # (line number, text, None) per non-blank line; with field each line is a JSON object,
+    # and one without a string in that field comes as (line number, None, what is wrong)
+    for number, line in enumerate(file, 1):
+        if not line.strip():
+            continue
+        if field is None:
+            yield number, line, None
+            continue
+        try:
+            text = json.loads(line)[field]
+        except ValueError as e:
+            yield number, None, 'invalid JSON: {}'.format(e)
+        except (KeyError, TypeError):
+            yield number, None, 'no field {}'.format(field)
+        else:
+            if isinstance(text, str):
+                yield number, text, None
+            else:
+                yield number, None, 'field {} is not a string'.format(field)
+
+
+def main(argv=None):
+    args = argparse.ArgumentParser(description='Parse and optimize a file of expressions, one per line.')
+    args.add_argument('input', nargs='?', default='-', help='input file, - for stdin')
+    args.add_argument('-o', '--output', default='-', help='output file, - for stdout')
+    args.add_argument('--jsonl', metavar='FIELD', help='read JSON lines and take the expression from FIELD')
+    args.add_argument('-j', '--workers', type=int, help='worker processes, 0 to run in process')
+    args.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    args.add_argument('--check', action='store_true',
+                      help='only check the syntax, writing ok or the error and its offset')
+    args = args.parse_args(argv)
+
+    source = sys.stdin if args.input == '-' else open(args.input)
+    output = sys.stdout if args.output == '-' else open(args.output, 'w')
+    lines, texts = tee(read_texts(source, args.jsonl))
+    texts = (text for _, text, problem in texts if problem is None)
+    results = run(texts, args.workers, args.chunk_size, check=args.check)
+    failed = 0
+    try:
+        for number, _, problem in lines:
+            if problem is not None:
+                record = {'line': number, 'ok': False} if args.check else {'line': number}
+                record.update(error=problem, offset=None)
+            elif args.check:
+                result = next(results)
+                record = {'line': number, 'ok': result.ok}
+                if not result.ok:
+                    record.update(error=result.message, offset=result.offset)
+            else:
+                tree, error, offset = next(results)
+                if error is None:
+                    record = {'line': number, 'tree': base64.b64encode(tree).decode('ascii')}
+                else:
+                    record = {'line': number, 'error': error, 'offset': offset}
+            if 'error' in record:
+                failed += 1
+            output.write(json.dumps(record))
+            output.write('\n')
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
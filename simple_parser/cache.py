@@ -0,0 +1,116 @@
+import shelve
+import sys
+from collections import OrderedDict
+
+from .core import Node, _token_re, count_nodes, optimize, parse
+from .serialize import dumps, loads
+
+NODE_BYTES = sys.getsizeof(Node())
+
+
+def normalize(text):
+    # the token sequence with one space between tokens: spacing never changes the parse
+    return ' '.join(_token_re('text').findall(text))
+
+
+# LRU of parsed trees keyed on whitespace-normalized text, bounded by entry count and
+# by an estimate of the bytes held in nodes. With cache_optimized the optimize() results
+# are kept as well. With path the entries also go to a shelve file, so a restarted process
+# finds them there instead of parsing again. Cached trees are shared by every caller
+# and must not be modified in place; optimized trees share subtrees with them.
+class ParseCache:
+    def __init__(self, max_entries=1024, max_bytes=64 << 20, cache_optimized=False, path=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.cache_optimized = cache_optimized
+        self.entries = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_hits = 0
+        self.disk = None if path is None else shelve.open(path)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, text):
+        return normalize(text) in self.entries
+
+    def parse(self, text):
+        return self._entry(normalize(text), text)[0]
+
+    def optimize(self, text):
+        key = normalize(text)
+        entry = self._entry(key, text)
+        if entry[1] is not None:
+            return entry[1]
+        optimized = optimize(entry[0])
+        if self.cache_optimized:
+            entry[1] = optimized
+            size = count_nodes(optimized) * NODE_BYTES
+            entry[2] += size
+            if key in self.entries:
+                self.nbytes += size
+            self._save(key, entry)
+            self._evict()
+        return optimized
+
+    def stats(self):
+        return {
+            'entries': len(self.entries),
+            'bytes': self.nbytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'disk_hits': self.disk_hits,
+            'evictions': self.evictions,
+        }
+
+    def clear(self):
+        self.entries.clear()
+        self.nbytes = 0
+
+    def close(self):
+        if self.disk is not None:
+            self.disk.close()
+            self.disk = None
+
+    # entry is [tree, optimized tree or None, estimated bytes]. A miss parses text itself,
+    # not the key, so a ParseError has its offset in the caller's text.
+    def _entry(self, key, text):
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+        self.misses += 1
+        entry = self._load(key)
+        if entry is None:
+            tree = parse(text)
+            entry = [tree, None, sys.getsizeof(key) + count_nodes(tree) * NODE_BYTES]
+            self._save(key, entry)
+        else:
+            self.disk_hits += 1
+        self.entries[key] = entry
+        self.nbytes += entry[2]
+        self._evict()
+        return entry
+
+    def _evict(self):
+        while self.entries and (len(self.entries) > self.max_entries or self.nbytes > self.max_bytes):
+            entry = self.entries.popitem(last=False)[1]
+            self.nbytes -= entry[2]
+            self.evictions += 1
+
+    # on disk the trees are kept in the serialize format, which loads at any depth
+    def _save(self, key, entry):
+        if self.disk is None:
+            return
+        self.disk[key] = (dumps(entry[0]), None if entry[1] is None else dumps(entry[1]), entry[2])
+
+    def _load(self, key):
+        if self.disk is None or key not in self.disk:
+            return None
+        tree, optimized, size = self.disk[key]
+        return [loads(tree), None if optimized is None else loads(optimized), size]
+
@@ -0,0 +1,101 @@
+import sys
+
+from .core import (
+    Lexer, LexerError, Parser, ParserError, count_height, count_nodes, minimize_tree, same_tree,
+)
+
+LABELS = ('Parsed tree: ', 'Minimized tree: ', 'Similar tree: ', 'Similar parallel tree')
+PRINTERS = ('tree', 'levels')
+
+
+def arguments(argv):
+    import argparse
+    args = argparse.ArgumentParser(prog='simple_parser',
+                                   description='Parse a program from stdin and print its trees.')
+    args.add_argument('--printer', choices=PRINTERS, default='tree',
+                      help='boxed tree pictures, or one list of kinds per level')
+    args.add_argument('--stats', action='store_true',
+                      help='write per-phase timings, counters and peak memory as JSON to stderr')
+    return args.parse_args(argv)
+
+
+# a do-nothing phase, so plain runs need not import contextlib
+class _NoPhase:
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NO_PHASE = _NoPhase()
+
+
+# a Lexer that counts the tokens it hands out, for --stats only
+class _CountingLexer(Lexer):
+    tokens = 0
+
+    def next_tok(self):
+        Lexer.next_tok(self)
+        self.tokens += 1
+
+
+# Reads a program from stdin and prints it parsed, minimized, GCD-factored, and both.
+# Without options nothing beyond the core is imported: argparse, the stats machinery and
+# the level printer load only when asked for, and the tree renderer on first print.
+def main(argv=None, labels=LABELS):
+    argv = sys.argv[1:] if argv is None else argv
+    printer = 'tree'
+    stats = None
+    if argv:
+        args = arguments(argv)
+        printer = args.printer
+        if args.stats:
+            from .stats import Stats
+            stats = Stats(memory=True)
+    phase = stats.phase if stats is not None else lambda name: _NO_PHASE
+    if printer == 'levels':
+        from .levels import print_tree
+
+        def show(label, tree):
+            print(label)
+            with phase('render'):
+                print_tree(tree)
+    else:
+        def show(label, tree):
+            with phase('render'):
+                text = str(tree)
+            print(label, text)
+    try:
+        # the streaming lexer feeds the parser token by token, so 'parse' includes lexing
+        lexer = Lexer() if stats is None else _CountingLexer()
+        with phase('parse'):
+            ast = Parser(lexer).parse()
+    except LexerError as e:
+        print('Lexer error: ', e)
+        sys.exit(1)
+    except ParserError as e:
+        print('Parser error:', e)
+        sys.exit(1)
+    if stats is not None:
+        stats.count('tokens', lexer.tokens)
+        stats.count('nodes', count_nodes(ast))
+        stats.set('height_before', count_height(ast))
+    show(labels[0], ast)
+
+    with phase('minimize_tree'):
+        min_tree = minimize_tree(ast, stats)
+    show(labels[1], min_tree)
+
+    with phase('same_tree'):
+        similar = same_tree(ast, stats)
+    show(labels[2], similar)
+
+    with phase('same_tree'):
+        similar_parallel = same_tree(min_tree, stats)
+    show(labels[3], similar_parallel)
+
+    if stats is not None:
+        stats.set('height_after', count_height(similar_parallel))
+        stats.close()
+        print(stats.json(), file=sys.stderr)
@@ -0,0 +1,1234 @@
+import mmap
+import os
+import sys
+from array import array
+from itertools import accumulate
+from operator import add, attrgetter
+
+
+CHUNK_SIZE = 1 << 16
+
+
+class StringSource:
+    def __init__(self, text):
+        self.text = text
+        self.size = len(text)
+        self.pos = 0
+
+    def getc(self):
+        pos = self.pos
+        if pos >= self.size:
+            return ''
+        self.pos = pos + 1
+        return self.text[pos]
+
+    def drain(self):
+        pos = self.pos
+        self.pos = self.size
+        return self.text, pos
+
+
+class BufferSource:
+    # bytes, bytearray, memoryview or mmap: indexed in place, never copied
+    def __init__(self, buf):
+        self.buf = buf
+        self.size = len(buf)
+        self.pos = 0
+
+    def getc(self):
+        pos = self.pos
+        if pos >= self.size:
+            return ''
+        self.pos = pos + 1
+        return chr(self.buf[pos])
+
+    def drain(self):
+        pos = self.pos
+        self.pos = self.size
+        return self.buf, pos
+
+
+class FileSource:
+    # reads the file in chunks, binary chunks are decoded byte-for-byte;
+    # read1() hands over whatever a pipe has instead of waiting for a full chunk.
+    # Text files (sys.stdin among them) have no read1() and their read(n) waits for n
+    # characters, so they are read through the byte buffer below and decoded here.
+    def __init__(self, f, chunk_size=CHUNK_SIZE):
+        self.file = f
+        self.read = getattr(f, 'read1', None)
+        self.read_all = f.read
+        self.decode = None
+        buffer = getattr(f, 'buffer', None)
+        if self.read is None and hasattr(buffer, 'read1'):
+            import codecs
+            self.read = buffer.read1
+            self.read_all = buffer.read
+            self.decode = codecs.getincrementaldecoder(f.encoding or 'utf-8')(f.errors or 'strict').decode
+        elif self.read is None:
+            self.read = f.read
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.size = 0
+        self.pos = 0
+
+    def getc(self):
+        pos = self.pos
+        if pos >= self.size:
+            chunk = self._chunk()
+            if not chunk:
+                return ''
+            self.buf = chunk
+            self.size = len(chunk)
+            pos = 0
+        self.pos = pos + 1
+        return self.buf[pos]
+
+    def _chunk(self):
+        # '' only at the end: a chunk that ends inside a character decodes with the next one
+        while self.file is not None:
+            data = self.read(self.chunk_size)
+            if not data:
+                self.file = None
+            data = self._text(data)
+            if data:
+                return data
+        return ''
+
+    def _text(self, data):
+        if self.decode is not None:
+            return self.decode(data, self.file is None)
+        if not isinstance(data, str):
+            return data.decode('latin-1')
+        return data
+
+    def drain(self):
+        rest = self.buf[self.pos:]
+        if self.file is not None:
+            tail = self.read_all()
+            self.file = None
+            rest += self._text(tail)
+        self.buf = ''
+        self.size = self.pos = 0
+        return rest, 0
+
+
+def map_file(path):
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return BufferSource(b'')
+        return BufferSource(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+def make_source(source):
+    if source is None:
+        return FileSource(sys.stdin)
+    if isinstance(source, str):
+        return StringSource(source)
+    if isinstance(source, (bytes, bytearray, memoryview, mmap.mmap)):
+        return BufferSource(source)
+    if hasattr(source, 'getc'):
+        return source
+    if hasattr(source, 'read'):
+        return FileSource(source)
+    raise TypeError('Unsupported lexer source: ' + type(source).__name__)
+
+
+class ParseError(Exception):
+    # offset is where in the parsed text the error was found, None when unknown
+    def __init__(self, message, offset=None):
+        super().__init__(message)
+        self.offset = offset
+
+
+class LexerError(ParseError):
+    pass
+
+
+class ParserError(ParseError):
+    pass
+
+
+class Tokens:
+    # parallel columns per token: symbol code, NUM/ID value, start and end source offsets.
+    # When the text has a bad token the columns stop there, and the last entry stands for
+    # it: `error` holds the LexerError to raise once a parser gets that far.
+    def __init__(self):
+        self.syms = array('b')
+        self.values = array('q')
+        self.offsets = array('q')
+        self.ends = array('q')
+        self.error = None
+
+    def __len__(self):
+        return len(self.syms)
+
+
+class Lexer:
+
+    NUM, ID, LPAR, RPAR, PLUS, MINUS, EQUAL, DIVIDE, MULT, SEMICOLON, EOF = range(11)
+
+    SYMBOLS = {'=': EQUAL, ';': SEMICOLON, '(': LPAR, ')': RPAR, '+': PLUS, '-': MINUS, '/': DIVIDE, '*': MULT}
+
+    ch = ' '
+    # offset of self.ch; start and end give the span of the current token
+    pos = -1
+    start = None
+
+    def __init__(self, source=None):
+        self.source = make_source(source)
+
+    def error(self, msg):
+        raise LexerError(msg, self.start)
+
+    def getc(self):
+        self.ch = self.source.getc()
+        self.pos += 1
+
+    def next_tok(self):
+        self.value = None
+        self.sym = None
+        while self.sym == None:
+            self.start = self.pos
+            if len(self.ch) == 0:
+                self.sym = Lexer.EOF
+            elif self.ch.isspace():
+                self.getc()
+            elif self.ch in Lexer.SYMBOLS:
+                self.sym = Lexer.SYMBOLS[self.ch]
+                if self.sym == Lexer.SEMICOLON:
+                    # the character after ';' is read with the next token (a blank stands in
+                    # for it until then), so a statement from a pipe ends without more input
+                    self.ch = ' '
+                    self.end = self.pos + 1
+                    return
+                self.getc()
+            elif self.ch.isdecimal():
+                intval = 0
+                while self.ch.isdecimal():
+                    intval = intval * 10 + int(self.ch)
+                    self.getc()
+                self.value = intval
+                self.sym = Lexer.NUM
+            elif self.ch.isascii() and self.ch.isalpha():
+                ident = ''
+                while self.ch.isascii() and self.ch.isalpha():
+                    ident = ident + self.ch.lower()
+                    self.getc()
+                if len(ident) == 1:
+                    self.sym = Lexer.ID
+                    self.value = ord(ident) - ord('a')
+                else:
+                    self.error('Unknown identifier: ' + ident)
+            else:
+                self.error('Unexpected symbol: ' + self.ch)
+        self.end = self.pos
+
+    # bulk mode for a fresh lexer: scans everything left in the source in one pass
+    def tokenize(self):
+        buf, pos = self.source.drain()
+        if pos:
+            buf = buf[pos:]
+        if isinstance(buf, str):
+            split = _token_re('ascii' if buf.isascii() else 'text').split
+            table = _TokenTable(self, Lexer.SYMBOLS)
+        else:
+            split = _token_re('bytes').split
+            table = _TokenTable(self, _BYTES_SYMBOLS)
+        # [gap, token, gap, token, ..., gap]: every non-blank character lands in a token
+        parts = split(buf)
+        texts = parts[1::2]
+        error = None
+        try:
+            pairs = list(map(table.__getitem__, texts))
+        except LexerError as e:
+            # the table knows spellings, not places: the first unknown token is the culprit,
+            # and the tokens stop there so that earlier syntax errors still come first
+            i = next(i for i, text in enumerate(texts) if text not in table)
+            e.offset = pos + sum(map(len, parts[:2 * i + 1]))
+            error = e
+            texts = texts[:i]
+            pairs = list(map(table.__getitem__, texts))
+        pairs.append((Lexer.EOF, 0))
+        tokens = Tokens()
+        tokens.error = error
+        tokens.syms = array('b', [pair[0] for pair in pairs])
+        values = [pair[1] for pair in pairs]
+        try:
+            tokens.values = array('q', values)
+        except OverflowError:
+            tokens.values = values
+        tokens.offsets = array('q', accumulate(map(len, parts), initial=pos))[1::2][:len(pairs)]
+        tokens.ends = array('q', map(add, tokens.offsets, map(len, texts)))
+        tokens.ends.append(tokens.offsets[-1])
+        return tokens
+
+
+class _TokenTable(dict):
+    # token text -> (sym, value), classified once per distinct spelling
+    def __init__(self, lexer, symbols):
+        super().__init__((text, (sym, 0)) for text, sym in symbols.items())
+        self.lexer = lexer
+
+    def __missing__(self, text):
+        # bytes are classified as the Latin-1 characters BufferSource reads them as;
+        # numbers are decimal digits and variables ASCII letters, as in Lexer.next_tok
+        chars = _as_text(text)
+        if chars.isdecimal():
+            pair = (Lexer.NUM, int(chars))
+        elif chars.isascii() and chars.isalpha():
+            ident = chars.lower()
+            if len(ident) != 1:
+                self.lexer.error('Unknown identifier: ' + ident)
+            pair = (Lexer.ID, ord(ident) - ord('a'))
+        else:
+            self.lexer.error('Unexpected symbol: ' + chars)
+        self[text] = pair
+        return pair
+
+
+_TOKEN_PATTERNS = {
+    'text': r'(\d+|[A-Za-z]+|\S)',
+    'ascii': r'([0-9]+|[A-Za-z]+|\S)',
+    # bytes blanks are those str.isspace() finds in Latin-1
+    'bytes': rb'([0-9]+|[A-Za-z]+|[^\t-\r\x1c- \x85\xa0])',
+}
+_token_res = {}
+_BYTES_SYMBOLS = {key.encode(): sym for key, sym in Lexer.SYMBOLS.items()}
+
+
+def _token_re(kind):
+    # compiled on first use: re is slow to import and the streaming Lexer never needs it
+    pattern = _token_res.get(kind)
+    if pattern is None:
+        import re
+        pattern = _token_res[kind] = re.compile(_TOKEN_PATTERNS[kind])
+    return pattern
+
+
+def _as_text(s):
+    return s if isinstance(s, str) else s.decode('latin-1')
+
+
+class TokenLexer:
+    # drop-in Lexer for Parser that walks a Tokens array by index
+    def __init__(self, tokens):
+        self.syms = tokens.syms
+        self.values = tokens.values
+        self.starts = tokens.offsets
+        self.ends = tokens.ends
+        self.last = len(tokens.syms) - 1
+        self.error = tokens.error
+        self.index = -1
+        self.sym = None
+        self.value = None
+
+    def next_tok(self):
+        i = self.index
+        if i < self.last:
+            i += 1
+            self.index = i
+            if i == self.last and self.error is not None:
+                raise self.error
+        self.sym = self.syms[i]
+        self.value = self.values[i]
+
+    # looked up only when asked for, so parsing without spans pays nothing for them
+    @property
+    def start(self):
+        return self.starts[self.index]
+
+    @property
+    def end(self):
+        return self.ends[self.index]
+
+
+class Node:
+    __slots__ = ('kind', 'value', 'left', 'right', 'parent', 'op_tick', 'counted', 'level', 'height', 'start', 'end',
+                 'digest')
+
+    def __init__(self, kind=None, value=None, left=None, right=None, parent=None, op_tick=None, counted=None, level=None):
+        self.kind = kind
+        self.value = value
+        self.left = left
+        self.right = right
+        self.parent = parent
+        self.op_tick = op_tick
+        self.counted = counted
+        self.level = level
+        self.height = None
+        self.start = None
+        self.end = None
+        self.digest = None
+
+    def print_tree(self):
+        if self.left:
+            self.left.PrintTree()
+        print(self.kind),
+        if self.right:
+            self.right.PrintTree()
+
+    def __str__(self):
+        return _picture(self)
+
+
+class TreeStore:
+    # struct-of-arrays tree: node i is kind[i], value[i], left[i], right[i]; -1 is "no node"
+    def __init__(self):
+        self.kind = array('b')
+        self.value = array('q')
+        self.left = array('q')
+        self.right = array('q')
+        self.parent = array('q')
+        self.height = array('q')
+
+    def __len__(self):
+        return len(self.kind)
+
+    def kind_of(self, i):
+        return self.kind[i]
+
+    def add(self, kind, value=None, left=None, right=None):
+        i = len(self.kind)
+        self.kind.append(kind)
+        try:
+            self.value.append(0 if value is None else value)
+        except OverflowError:
+            self.value = list(self.value)
+            self.value.append(value)
+        self.left.append(-1 if left is None else left)
+        self.right.append(-1 if right is None else right)
+        self.parent.append(-1)
+        self.height.append(0)
+        return i
+
+    def set_value(self, i, value):
+        try:
+            self.value[i] = 0 if value is None else value
+        except OverflowError:
+            self.value = list(self.value)
+            self.value[i] = value
+
+    def ref(self, i):
+        return None if i < 0 else StoreNode(self, i)
+
+    def index_of(self, node):
+        if node is None:
+            return -1
+        if isinstance(node, StoreNode) and node.store is self:
+            return node.index
+        return self.add_tree(node)
+
+    def add_tree(self, node):
+        # appends a copy of any node-like tree, children before parents
+        index = {}
+        stack = [node]
+        while stack:
+            n = stack[-1]
+            if n.left is not None and id(n.left) not in index:
+                stack.append(n.left)
+            elif n.right is not None and id(n.right) not in index:
+                stack.append(n.right)
+            else:
+                stack.pop()
+                left = None if n.left is None else index[id(n.left)]
+                right = None if n.right is None else index[id(n.right)]
+                index[id(n)] = self.add(n.kind, n.value, left, right)
+        return index[id(node)]
+
+    def copy(self):
+        store = TreeStore()
+        store.kind = self.kind[:]
+        store.value = self.value[:]
+        store.left = self.left[:]
+        store.right = self.right[:]
+        store.parent = self.parent[:]
+        store.height = self.height[:]
+        return store
+
+    def nbytes(self):
+        columns = (self.kind, self.value, self.left, self.right, self.parent, self.height)
+        return sum(col.itemsize * len(col) if isinstance(col, array) else sys.getsizeof(col) for col in columns)
+
+
+# Hash-consing node factory: add() hands out one shared Node per distinct
+# (kind, value, left, right), so repeated subexpressions become a single node and the
+# tree a DAG. Children are interned before their parents, which makes node identity
+# the same as structural equality. minimize_tree and same_tree with inplace=True
+# rewrite nodes in place and need a plain tree; copy() unshares a DAG again.
+class Interner:
+    def __init__(self):
+        self.table = {}
+
+    def __len__(self):
+        return len(self.table)
+
+    kind_of = staticmethod(attrgetter('kind'))
+
+    def add(self, kind, value=None, left=None, right=None):
+        key = (kind, value, left, right)
+        node = self.table.get(key)
+        if node is None:
+            node = self.table[key] = Node(kind, value=value, left=left, right=right)
+        return node
+
+    def ref(self, node):
+        return node
+
+    def intern(self, node):
+        # shared copy of any node-like tree, children before parents
+        index = {}
+        stack = [node]
+        while stack:
+            n = stack[-1]
+            if n.left is not None and n.left not in index:
+                stack.append(n.left)
+            elif n.right is not None and n.right not in index:
+                stack.append(n.right)
+            else:
+                stack.pop()
+                left = None if n.left is None else index[n.left]
+                right = None if n.right is None else index[n.right]
+                index[n] = self.add(n.kind, n.value, left, right)
+        return index[node]
+
+
+class StoreNode:
+    # Node-compatible view of one TreeStore row, so the tree functions work on stores unchanged
+    __slots__ = ('store', 'index')
+
+    def __init__(self, store, index):
+        self.store = store
+        self.index = index
+
+    @property
+    def kind(self):
+        return self.store.kind[self.index]
+
+    @kind.setter
+    def kind(self, kind):
+        self.store.kind[self.index] = kind
+
+    @property
+    def value(self):
+        if self.store.kind[self.index] > Parser.CONST:
+            return None
+        return self.store.value[self.index]
+
+    @value.setter
+    def value(self, value):
+        self.store.set_value(self.index, value)
+
+    @property
+    def left(self):
+        return self.store.ref(self.store.left[self.index])
+
+    @left.setter
+    def left(self, node):
+        self.store.left[self.index] = self.store.index_of(node)
+
+    @property
+    def right(self):
+        return self.store.ref(self.store.right[self.index])
+
+    @right.setter
+    def right(self, node):
+        self.store.right[self.index] = self.store.index_of(node)
+
+    @property
+    def parent(self):
+        return self.store.ref(self.store.parent[self.index])
+
+    @parent.setter
+    def parent(self, node):
+        self.store.parent[self.index] = self.store.index_of(node)
+
+    @property
+    def height(self):
+        return self.store.height[self.index]
+
+    @height.setter
+    def height(self, height):
+        self.store.height[self.index] = height
+
+    # stores keep no fingerprints (merkle hashes them afresh), so there is none to clear
+    @property
+    def digest(self):
+        return None
+
+    @digest.setter
+    def digest(self, digest):
+        pass
+
+    def __eq__(self, other):
+        return isinstance(other, StoreNode) and other.store is self.store and other.index == self.index
+
+    def __hash__(self):
+        return hash((id(self.store), self.index))
+
+    def __str__(self):
+        return _picture(self)
+
+
+def _picture(node):
+    # the renderer is only imported once a tree gets printed
+    from .render import RENDER_MAX_NODES, render_tree
+    return '\n' + render_tree(node, max_nodes=RENDER_MAX_NODES)
+
+
+def set_parent(root, par=None):
+    stack = [(root, par)]
+    while stack:
+        root, par = stack.pop()
+        if root is not None:
+            root.parent = par
+            stack.append((root.right, root))
+            stack.append((root.left, root))
+
+
+# Returns the rotated tree and leaves node's shape alone (only its cached heights are
+# filled in): new nodes are built along the rotated paths and every other subtree is
+# shared with the input. With inplace=True the nodes are rotated in place instead,
+# which allocates nothing, but a DAG from Interner then has to be copied first.
+def minimize_tree(node, stats=None, inplace=False):
+    if node is None:
+        return
+    set_height(node)
+    if inplace:
+        return _minimize(node, {None}, stats)
+    return _minimized(node, stats)
+
+
+# Heights are cached on the nodes and patched after each rotation instead of recounted.
+# A node is revisited once its children are minimized, since shrinking them can make
+# it rotatable again; subtrees already in `done` are not walked twice.
+# Frames are [node, parent, is_right_child, step] on an explicit stack: step 0 rotates or
+# descends, step 1 means the left child came back, step 2 the right one.
+def _minimize(root, done, stats=None):
+    if root in done:
+        return root
+    rotations = 0
+    stack = [[root, None, False, 0]]
+    while stack:
+        frame = stack[-1]
+        node = frame[0]
+        step = frame[3]
+        if step == 0:
+            pivot = node.left
+            new_type = 0
+            if pivot is not None and pivot.kind == node.kind and pivot.height - _height(node.right) > 1:
+                if pivot.kind == Parser.ADD or pivot.kind == Parser.MULTIPLY:
+                    new_type = pivot.kind
+                elif pivot.kind == Parser.SUB:
+                    new_type = Parser.ADD
+                elif pivot.kind == Parser.DIVIDE:
+                    new_type = Parser.MULTIPLY
+            if new_type != 0:
+                node.left = pivot.right
+                node.kind = new_type
+                _update_height(node)
+                pivot.right = node
+                _update_height(pivot)
+                rotations += 1
+
+                frame[0] = pivot
+            elif node.left not in done:
+                frame[3] = 1
+                stack.append([node.left, node, False, 0])
+            elif node.right not in done:
+                frame[3] = 2
+                stack.append([node.right, node, True, 0])
+            else:
+                done.add(node)
+                # the fingerprint of every node on a rewritten path is stale
+                node.digest = None
+                stack.pop()
+                parent = frame[1]
+                if parent is None:
+                    root = node
+                elif frame[2]:
+                    parent.right = node
+                else:
+                    parent.left = node
+        elif step == 1 and node.right not in done:
+            frame[3] = 2
+            stack.append([node.right, node, True, 0])
+        else:
+            _update_height(node)
+            frame[3] = 0
+    if stats is not None:
+        stats.count('rotations', rotations)
+    return root
+
+
+# _minimize without writes to the input. Frames are [input node, current node, step] and
+# make the same moves: a rotation builds two new nodes, and a child coming back changed
+# is attached to a new copy of its parent. `done` maps every finished node, input or
+# new, to its result, so a node shared in a DAG is minimized once and stays shared.
+def _minimized(root, stats=None):
+    done = {None: None}
+    rotations = 0
+    stack = [[root, root, 0]]
+    while stack:
+        frame = stack[-1]
+        node = frame[1]
+        step = frame[2]
+        if step == 0:
+            pivot = node.left
+            new_type = 0
+            if pivot is not None and pivot.kind == node.kind and pivot.height - _height(node.right) > 1:
+                if pivot.kind == Parser.ADD or pivot.kind == Parser.MULTIPLY:
+                    new_type = pivot.kind
+                elif pivot.kind == Parser.SUB:
+                    new_type = Parser.ADD
+                elif pivot.kind == Parser.DIVIDE:
+                    new_type = Parser.MULTIPLY
+            if new_type != 0:
+                lower = Node(new_type, node.value, pivot.right, node.right)
+                _update_height(lower)
+                node = Node(pivot.kind, pivot.value, pivot.left, lower)
+                _update_height(node)
+                rotations += 1
+
+                frame[1] = node
+            elif node.left not in done:
+                frame[2] = 1
+                stack.append([node.left, node.left, 0])
+            elif node.right not in done:
+                frame[2] = 2
+                stack.append([node.right, node.right, 0])
+            elif done[node.left] is not node.left or done[node.right] is not node.right:
+                # children shared with a part of the DAG that is finished already
+                node = Node(node.kind, node.value, done[node.left], done[node.right])
+                _update_height(node)
+                frame[1] = node
+            else:
+                done[frame[0]] = node
+                done[node] = node
+                stack.pop()
+                if stack:
+                    parent = stack[-1]
+                    if parent[2] == 2 and parent[1].right is not node:
+                        parent[1] = _replaced(parent[1], parent[1].left, node)
+                    elif parent[2] == 1 and parent[1].left is not node:
+                        parent[1] = _replaced(parent[1], node, parent[1].right)
+                else:
+                    root = node
+        elif step == 1 and node.right not in done:
+            frame[2] = 2
+            stack.append([node.right, node.right, 0])
+        else:
+            _update_height(node)
+            frame[2] = 0
+    if stats is not None:
+        stats.count('rotations', rotations)
+    return root
+
+
+def _replaced(node, left, right):
+    # a copy with new children; its height is refreshed once the parent's turn comes again
+    new = Node(node.kind, node.value, left, right)
+    new.height = node.height
+    return new
+
+
+def _height(node):
+    return 0 if node is None else node.height
+
+
+def _update_height(node):
+    node.height = 1 + max(_height(node.left), _height(node.right))
+
+
+def set_height(root):
+    order = []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if node is not None:
+            order.append(node)
+            stack.append(node.left)
+            stack.append(node.right)
+    for node in reversed(order):
+        _update_height(node)
+
+
+def count_nodes(node):
+    result = 0
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node is not None:
+            result += 1
+            stack.append(node.left)
+            stack.append(node.right)
+    return result
+
+
+def count_height(node):
+    result = 0
+    stack = [(node, 1)]
+    while stack:
+        node, depth = stack.pop()
+        if node is not None:
+            if depth > result:
+                result = depth
+            stack.append((node.left, depth + 1))
+            stack.append((node.right, depth + 1))
+    return result
+
+
+def find_gcd(a, b):
+    a, b = abs(a), abs(b)
+    while a != 0 and b != 0:
+        if a > b:
+            a = a % b
+        else:
+            b = b % a
+    return a + b
+
+
+# Rewrites a + b and a - b of two constants sharing a factor g > 1 as (a/g op b/g) * g.
+# The input is left alone: rewritten nodes and their ancestors are new, every other
+# subtree is shared. With inplace=True the nodes are rewritten in place instead.
+def same_tree(node, stats=None, inplace=False):
+    if node is None:
+        return
+    if not inplace:
+        return _factored(node, stats)
+    factorings = 0
+    stack = [node]
+    while stack:
+        n = stack.pop()
+        n.digest = None
+        if n.kind == Parser.ADD or n.kind == Parser.SUB:
+            if n.left.kind == Parser.CONST and n.right.kind == Parser.CONST:
+                left = n.left
+                right = n.right
+                gcd = find_gcd(n.left.value, n.right.value)
+                if gcd > 1:
+                    n.left.left = Node(Parser.CONST, value=left.value // gcd)
+                    n.left.right = Node(Parser.CONST, value=right.value // gcd)
+                    n.right.kind = Parser.CONST
+                    n.right.value = gcd
+                    n.left.kind = n.kind
+                    n.left.value = None
+                    n.kind = Parser.MULTIPLY
+                    factorings += 1
+        if n.right is not None:
+            stack.append(n.right)
+        if n.left is not None:
+            stack.append(n.left)
+    if stats is not None:
+        stats.count('gcd_factorings', factorings)
+    return node
+
+
+# Folds constants and drops identities (x+0, x-0, x*1, x/1, and x*0 when x neither
+# assigns nor divides by anything but a nonzero constant) bottom up with an explicit
+# stack. ADD/SUB and MULTIPLY chains are flattened so all their constants collect into
+# one trailing term; other terms keep their order. Division folds only when exact.
+# Unchanged subtrees are reused, not copied, so the result may share nodes with the
+# input tree. Nodes shared in a DAG are simplified once and chains are not flattened
+# through them.
+def simplify(node):
+    if node is None:
+        return
+    shared = _shared_nodes(node)
+    memo = {}
+    stack = [(node, None)]
+    done = []
+    while stack:
+        n, terms = stack.pop()
+        if n is None:
+            done.append((None, False))
+        elif n.kind == Parser.VAR or n.kind == Parser.CONST:
+            done.append((n, False))
+        elif terms is None:
+            if n in memo:
+                done.append(memo[n])
+                continue
+            if n.kind == Parser.ADD or n.kind == Parser.SUB or n.kind == Parser.MULTIPLY:
+                terms = _chain_terms(n, shared)
+            else:
+                terms = [(n.left, True), (n.right, True)]
+            stack.append((n, terms))
+            for term in reversed(terms):
+                stack.append((term[0], None))
+        else:
+            results = done[-len(terms):]
+            del done[-len(terms):]
+            # effects: the subtree assigns or may divide by zero, so it cannot be dropped
+            effects = n.kind == Parser.SET or any(result[1] for result in results)
+            if n.kind == Parser.DIVIDE:
+                divisor = results[1][0]
+                effects = effects or divisor.kind != Parser.CONST or divisor.value == 0
+            result = (_simplified(n, terms, results, effects), effects)
+            if n in shared:
+                memo[n] = result
+            done.append(result)
+    return done[0][0]
+
+
+def _shared_nodes(root):
+    # operator nodes reachable along more than one path; empty for a plain tree
+    seen = set()
+    shared = set()
+    stack = [root]
+    while stack:
+        n = stack.pop()
+        if n is not None and n.kind > Parser.CONST:
+            if n in seen:
+                shared.add(n)
+            else:
+                seen.add(n)
+                stack.append(n.left)
+                stack.append(n.right)
+    return shared
+
+
+def _chain_terms(node, shared):
+    # operands of the ADD/SUB (or MULTIPLY) chain under node, with their signs
+    multiply = node.kind == Parser.MULTIPLY
+    terms = []
+    stack = [(node, True)]
+    while stack:
+        n, positive = stack.pop()
+        if n is not node and n in shared:
+            terms.append((n, positive))
+        elif multiply and n.kind == Parser.MULTIPLY:
+            stack.append((n.right, True))
+            stack.append((n.left, True))
+        elif not multiply and (n.kind == Parser.ADD or n.kind == Parser.SUB):
+            stack.append((n.right, positive == (n.kind == Parser.ADD)))
+            stack.append((n.left, positive))
+        else:
+            terms.append((n, positive))
+    return terms
+
+
+def _simplified(n, terms, results, effects):
+    if n.kind == Parser.ADD or n.kind == Parser.SUB:
+        return _collect_sum(n, terms, results)
+    if n.kind == Parser.MULTIPLY:
+        return _collect_product(n, terms, results, effects)
+    left = results[0][0]
+    right = results[1][0]
+    if n.kind == Parser.DIVIDE and right.kind == Parser.CONST:
+        if right.value == 1:
+            return left
+        if left.kind == Parser.CONST and right.value != 0 and left.value % right.value == 0:
+            return Node(Parser.CONST, value=left.value // right.value)
+    if left is n.left and right is n.right:
+        return n
+    return Node(n.kind, value=n.value, left=left, right=right)
+
+
+def _collect_sum(n, terms, results):
+    total = 0
+    constants = 0
+    rest = []
+    changed = False
+    for (term, positive), (result, effects) in zip(terms, results):
+        changed = changed or result is not term
+        if result.kind == Parser.CONST:
+            constants += 1
+            total += result.value if positive else -result.value
+        else:
+            rest.append((result, positive))
+    if not changed and (constants == 0 or constants == 1 and total != 0):
+        return n
+    if not rest:
+        return Node(Parser.CONST, value=total)
+    result, positive = rest[0]
+    if not positive:
+        result = Node(Parser.SUB, left=Node(Parser.CONST, value=total), right=result)
+        total = 0
+    for term, positive in rest[1:]:
+        result = Node(Parser.ADD if positive else Parser.SUB, left=result, right=term)
+    if total > 0:
+        result = Node(Parser.ADD, left=result, right=Node(Parser.CONST, value=total))
+    elif total < 0:
+        result = Node(Parser.SUB, left=result, right=Node(Parser.CONST, value=-total))
+    return result
+
+
+def _collect_product(n, terms, results, effects):
+    product = 1
+    constants = 0
+    rest = []
+    changed = False
+    for (term, _), (result, _) in zip(terms, results):
+        changed = changed or result is not term
+        if result.kind == Parser.CONST:
+            constants += 1
+            product *= result.value
+        else:
+            rest.append(result)
+    if product == 0 and not effects:
+        return Node(Parser.CONST, value=0)
+    if not changed and (constants == 0 or constants == 1 and product != 1):
+        return n
+    if not rest:
+        return Node(Parser.CONST, value=product)
+    result = rest[0]
+    for term in rest[1:]:
+        result = Node(Parser.MULTIPLY, left=result, right=term)
+    if product != 1:
+        result = Node(Parser.MULTIPLY, left=result, right=Node(Parser.CONST, value=product))
+    return result
+
+
+def _factored(root, stats=None):
+    factorings = 0
+    # children before parents; a node shared in a DAG is factored once and its result
+    # reused, so the output shares it the same way
+    done = {None: None}
+    stack = [(root, False)]
+    while stack:
+        n, ready = stack.pop()
+        if not ready:
+            if n not in done:
+                stack.append((n, True))
+                stack.append((n.right, False))
+                stack.append((n.left, False))
+        elif n not in done:
+            left = done[n.left]
+            right = done[n.right]
+            result = n
+            gcd = 0
+            if (n.kind == Parser.ADD or n.kind == Parser.SUB) and left.kind == Parser.CONST and right.kind == Parser.CONST:
+                gcd = find_gcd(left.value, right.value)
+            if gcd > 1:
+                factors = Node(n.kind, left=Node(Parser.CONST, value=left.value // gcd),
+                               right=Node(Parser.CONST, value=right.value // gcd))
+                result = Node(Parser.MULTIPLY, left=factors, right=Node(Parser.CONST, value=gcd))
+                factorings += 1
+            elif left is not n.left or right is not n.right:
+                result = Node(n.kind, n.value, left, right)
+            done[n] = result
+    if stats is not None:
+        stats.count('gcd_factorings', factorings)
+    return done[root]
+
+
+def copy(node):
+    if isinstance(node, StoreNode):
+        return node.store.copy().ref(node.index)
+    # children are copied before their parents; finished copies wait on `done`
+    stack = [(node, False)]
+    done = []
+    while stack:
+        n, ready = stack.pop()
+        if n is None:
+            done.append(None)
+        elif ready:
+            right = done.pop()
+            left = done.pop()
+            done.append(Node(n.kind, value=n.value, left=left, right=right))
+        else:
+            stack.append((n, True))
+            stack.append((n.right, False))
+            stack.append((n.left, False))
+    return done[0]
+
+
+_kind_of = attrgetter('kind')
+
+
+class Parser:
+    VAR, CONST, ADD, SUB, MULTIPLY, DIVIDE, SET, EMPTY, EXPR, PROG, SEQ = range(11)
+
+    # with spans, nodes get the source offsets they cover (Node trees only) and
+    # self.parens lists (start, end, node) for every parenthesised group
+    def __init__(self, lexer, store=None, spans=False):
+        if spans and store is not None:
+            raise ValueError('spans are recorded on Node trees only, not with a store')
+        self.lexer = lexer
+        self.store = store
+        self.spans = spans
+        self.parens = []
+        if spans:
+            self.node = self.spanned_node
+            self.kind_of = _kind_of
+        elif store is None:
+            self.node = Node
+            self.kind_of = _kind_of
+        else:
+            self.node = store.add
+            self.kind_of = store.kind_of
+
+    def spanned_node(self, kind, value=None, left=None, right=None):
+        n = Node(kind, value, left, right)
+        if left is None:
+            n.start = self.lexer.start
+            n.end = self.lexer.end
+        else:
+            n.start = left.start
+            n.end = left.end if right is None else right.end
+            if kind == Parser.EXPR:
+                n.end = self.lexer.end
+        return n
+
+    def error(self, msg):
+        raise ParserError(msg, self.lexer.start)
+
+    def expr(self):
+        return self._expr(False)
+
+    def paren_expr(self):
+        return self._expr(True)
+
+    # Precedence parsing with an explicit stack of the enclosing parenthesised
+    # expressions, so nesting depth is bounded by memory rather than the C stack.
+    # Per expression it tracks the pending SET targets (a = b = ...), the left
+    # operand of an unfinished +/- and of an unfinished * or /.
+    def _expr(self, paren):
+        lexer = self.lexer
+        node = self.node
+        opens = []
+        if paren:
+            if lexer.sym != Lexer.LPAR:
+                self.error('"(" expected')
+            opens.append(lexer.start)
+            lexer.next_tok()
+        outer = []
+        assignable = lexer.sym == Lexer.ID
+        targets = None
+        add_left = mul_left = None
+        add_kind = mul_kind = None
+        while True:
+            sym = lexer.sym
+            if sym == Lexer.ID:
+                n = node(Parser.VAR, lexer.value)
+                lexer.next_tok()
+            elif sym == Lexer.NUM:
+                n = node(Parser.CONST, lexer.value)
+                lexer.next_tok()
+            else:
+                if sym != Lexer.LPAR:
+                    self.error('"(" expected')
+                opens.append(lexer.start)
+                lexer.next_tok()
+                outer.append((assignable, targets, add_left, add_kind, mul_left, mul_kind))
+                assignable = lexer.sym == Lexer.ID
+                targets = add_left = mul_left = None
+                continue
+            # n is a complete term: fold it into the enclosing operators until one needs another term
+            while True:
+                if mul_left is not None:
+                    n = node(mul_kind, left=mul_left, right=n)
+                    mul_left = None
+                sym = lexer.sym
+                if sym == Lexer.MULT or sym == Lexer.DIVIDE:
+                    mul_left = n
+                    mul_kind = Parser.MULTIPLY if sym == Lexer.MULT else Parser.DIVIDE
+                    lexer.next_tok()
+                    break
+                if add_left is not None:
+                    n = node(add_kind, left=add_left, right=n)
+                    add_left = None
+                if sym == Lexer.PLUS or sym == Lexer.MINUS:
+                    add_left = n
+                    add_kind = Parser.ADD if sym == Lexer.PLUS else Parser.SUB
+                    lexer.next_tok()
+                    break
+                if assignable and sym == Lexer.EQUAL and self.kind_of(n) == Parser.VAR:
+                    if targets is None:
+                        targets = []
+                    targets.append(n)
+                    lexer.next_tok()
+                    assignable = lexer.sym == Lexer.ID
+                    break
+                while targets:
+                    n = node(Parser.SET, left=targets.pop(), right=n)
+                if not outer and not paren:
+                    return n
+                if lexer.sym != Lexer.RPAR:
+                    self.error('")" expected')
+                start = opens.pop()
+                if self.spans:
+                    n.start = start
+                    n.end = lexer.end
+                    self.parens.append((start, lexer.end, n))
+                lexer.next_tok()
+                if not outer:
+                    return n
+                assignable, targets, add_left, add_kind, mul_left, mul_kind = outer.pop()
+
+    def statement(self):
+        n = self._statement()
+        self.lexer.next_tok()
+        return n
+
+    # stops on the closing ';' without reading the token after it
+    def _statement(self):
+        if self.lexer.sym == Lexer.SEMICOLON:
+            return self.node(Parser.EMPTY)
+        n = self.node(Parser.EXPR, left=self.expr())
+        if self.lexer.sym != Lexer.SEMICOLON:
+            self.error('";" expected')
+        return n
+
+    # PROG holds the only statement, or a left-leaning SEQ chain of all of them
+    def parse(self):
+        self.lexer.next_tok()
+        node = self.statement()
+        while self.lexer.sym != Lexer.EOF:
+            node = self.node(Parser.SEQ, left=node, right=self.statement())
+        node = self.node(Parser.PROG, left=node)
+        if self.store is not None:
+            return self.store.ref(node)
+        return node
+
+    # yields each statement as soon as its ';' is read, holding nothing else
+    def statements(self):
+        self.lexer.next_tok()
+        while self.lexer.sym != Lexer.EOF:
+            node = self._statement()
+            yield node if self.store is None else self.store.ref(node)
+            self.lexer.next_tok()
+
+
+def perform(node):
+    if node.kind == Parser.ADD:
+        return node.left.value + node.right.value
+    elif node.kind == Parser.SUB:
+        return node.left.value - node.right.value
+    elif node.kind == Parser.MULTIPLY:
+        return node.left.value * node.right.value
+    elif node.kind == Parser.DIVIDE:
+        return node.left.value / node.right.value
+
+
+def parse(source, spans=False, stats=None):
+    if stats is None:
+        return Parser(TokenLexer(Lexer(source).tokenize()), spans=spans).parse()
+    with stats.phase('lex'):
+        tokens = Lexer(source).tokenize()
+    stats.count('tokens', len(tokens))
+    with stats.phase('parse'):
+        tree = Parser(TokenLexer(tokens), spans=spans).parse()
+    stats.count('nodes', count_nodes(tree))
+    return tree
+
+
+def iter_statements(source=None):
+    return Parser(Lexer(source)).statements()
+
+
+# Every pass shares what it leaves unchanged, so the result shares subtrees with node and
+# node itself is never modified. inplace=True lets minimize_tree and same_tree rewrite
+# the nodes they are given instead, which can change node.
+def optimize(node, inplace=False, stats=None):
+    if stats is None:
+        return same_tree(minimize_tree(simplify(node), inplace=inplace), inplace=inplace)
+    stats.set('height_before', count_height(node))
+    with stats.phase('simplify'):
+        node = simplify(node)
+    with stats.phase('minimize_tree'):
+        node = minimize_tree(node, stats, inplace)
+    with stats.phase('same_tree'):
+        node = same_tree(node, stats, inplace)
+    stats.set('height_after', count_height(node))
+    stats.set('nodes_after', count_nodes(node))
+    return node
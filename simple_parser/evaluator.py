@@ -0,0 +1,300 @@
+import operator
+
+from .core import Parser
+
+# Lexer maps the identifiers a..z to variable indices 0..25
+VARIABLES = 26
+
+_OPS = {
+    Parser.ADD: operator.add,
+    Parser.SUB: operator.sub,
+    Parser.MULTIPLY: operator.mul,
+    Parser.DIVIDE: operator.truediv,
+}
+
+_UFUNCS = {
+    Parser.ADD: 'add',
+    Parser.SUB: 'subtract',
+    Parser.MULTIPLY: 'multiply',
+    Parser.DIVIDE: 'true_divide',
+}
+
+_OP_SIGNS = {
+    Parser.ADD: '+',
+    Parser.SUB: '-',
+    Parser.MULTIPLY: '*',
+    Parser.DIVIDE: '/',
+}
+
+
+def environment(**values):
+    env = [0] * VARIABLES
+    for name, value in values.items():
+        env[ord(name.lower()) - ord('a')] = value
+    return env
+
+
+# Tree walk with an explicit stack: children are evaluated left to right and their
+# values wait on `values`. SET stores into env; EXPR and PROG pass their statement's
+# value through, SEQ keeps the value of its last statement and EMPTY is None.
+def evaluate(node, env=None):
+    if env is None:
+        env = [0] * VARIABLES
+    values = []
+    stack = [(node, False)]
+    while stack:
+        n, ready = stack.pop()
+        kind = n.kind
+        if kind == Parser.CONST:
+            values.append(n.value)
+        elif kind == Parser.VAR:
+            values.append(env[n.value])
+        elif not ready:
+            stack.append((n, True))
+            if kind == Parser.SET:
+                stack.append((n.right, False))
+            else:
+                if n.right is not None:
+                    stack.append((n.right, False))
+                if n.left is not None:
+                    stack.append((n.left, False))
+        elif kind in _OPS:
+            right = values.pop()
+            values[-1] = _OPS[kind](values[-1], right)
+        elif kind == Parser.SET:
+            env[n.left.value] = values[-1]
+        elif kind == Parser.SEQ:
+            right = values.pop()
+            values[-1] = right
+        elif kind == Parser.EMPTY or n.left is None:
+            values.append(None)
+    return values[-1]
+
+
+# evaluate() for DAGs from Interner: a shared subexpression is computed once and its
+# value reused until the next SET, which drops every remembered value. Nodes whose
+# evaluation ran a SET are never remembered, so assignments are always replayed.
+def evaluate_shared(node, env=None):
+    if env is None:
+        env = [0] * VARIABLES
+    memo = {}
+    epoch = 0
+    values = []
+    stack = [(node, None)]
+    while stack:
+        n, start = stack.pop()
+        kind = n.kind
+        if kind == Parser.CONST:
+            values.append(n.value)
+        elif kind == Parser.VAR:
+            values.append(env[n.value])
+        elif start is None:
+            if n in memo:
+                values.append(memo[n])
+                continue
+            stack.append((n, epoch))
+            if kind == Parser.SET:
+                stack.append((n.right, None))
+            else:
+                if n.right is not None:
+                    stack.append((n.right, None))
+                if n.left is not None:
+                    stack.append((n.left, None))
+        else:
+            if kind in _OPS:
+                right = values.pop()
+                values[-1] = _OPS[kind](values[-1], right)
+            elif kind == Parser.SET:
+                env[n.left.value] = values[-1]
+                epoch += 1
+                memo.clear()
+                continue
+            elif kind == Parser.SEQ:
+                right = values.pop()
+                values[-1] = right
+            elif kind == Parser.EMPTY or n.left is None:
+                values.append(None)
+            if start == epoch:
+                memo[n] = values[-1]
+    return values[-1]
+
+
+# Compiles a tree into a Python function of env as flat three-address code, one line per
+# operator, so evaluating it again costs one call instead of a tree walk. Variables are
+# loaded into locals on entry and assigned ones written back on return. Temporaries are
+# recycled once consumed, so the function needs only as many locals as the widest point
+# of the walk. When the tree assigns, variable reads are pinned to a temporary at the
+# point the walk reaches them, keeping a + (a = 5) equal to the walker's result.
+def compile_tree(node, name='compiled'):
+    lines = []
+    free = []
+    temps = [0]
+    used = set()
+    assigned = set()
+    pinned = _has_set(node)
+
+    def temp():
+        if free:
+            return free.pop()
+        temps[0] += 1
+        return 't%d' % (temps[0] - 1)
+
+    def release(operand):
+        if operand[0] == 't':
+            free.append(operand)
+
+    operands = []
+    stack = [(node, False)]
+    while stack:
+        n, ready = stack.pop()
+        kind = n.kind
+        if kind == Parser.CONST:
+            operands.append(repr(n.value))
+        elif kind == Parser.VAR:
+            used.add(n.value)
+            if pinned:
+                t = temp()
+                lines.append('%s = v%d' % (t, n.value))
+                operands.append(t)
+            else:
+                operands.append('v%d' % n.value)
+        elif not ready:
+            stack.append((n, True))
+            if kind == Parser.SET:
+                stack.append((n.right, False))
+            else:
+                if n.right is not None:
+                    stack.append((n.right, False))
+                if n.left is not None:
+                    stack.append((n.left, False))
+        elif kind in _OP_SIGNS:
+            right = operands.pop()
+            left = operands.pop()
+            release(left)
+            release(right)
+            t = temp()
+            lines.append('%s = %s %s %s' % (t, left, _OP_SIGNS[kind], right))
+            operands.append(t)
+        elif kind == Parser.SET:
+            value = operands.pop()
+            release(value)
+            target = n.left.value
+            used.add(target)
+            assigned.add(target)
+            t = temp()
+            lines.append('%s = v%d = %s' % (t, target, value))
+            operands.append(t)
+        elif kind == Parser.SEQ:
+            right = operands.pop()
+            release(operands.pop())
+            operands.append(right)
+        elif kind == Parser.EMPTY or n.left is None:
+            operands.append('None')
+
+    body = ['v%d = env[%d]' % (i, i) for i in sorted(used)]
+    body.extend(lines)
+    body.extend('env[%d] = v%d' % (i, i) for i in sorted(assigned))
+    body.append('return %s' % operands[-1])
+    source = 'def %s(env):\n    %s\n' % (name, '\n    '.join(body))
+    namespace = {}
+    exec(compile(source, '<%s>' % name, 'exec'), namespace)
+    function = namespace[name]
+    function.source = source
+    return function
+
+
+# Evaluates one tree over whole NumPy columns: columns maps variable names or indices
+# to arrays (or is a sequence indexed like env), unbound variables read as 0. Every
+# operator is a single ufunc call written into a temporary this evaluation owns; an
+# operand temporary of the result dtype is reused in place and spare ones go back to a
+# pool, so a tree needs about as many arrays as it is deep rather than one per node.
+# Bound columns are never written, so true division of integer columns lands in a float
+# temporary. Arithmetic follows NumPy rules throughout (fixed width integers, inf on x/0).
+def evaluate_columns(node, columns):
+    import numpy as np
+
+    env = [0] * VARIABLES
+    items = columns.items() if hasattr(columns, 'items') else enumerate(columns)
+    size = None
+    for key, column in items:
+        if isinstance(key, str):
+            key = ord(key.lower()) - ord('a')
+        column = np.asarray(column)
+        if size is None and column.ndim:
+            size = len(column)
+        env[key] = column
+    ufuncs = {kind: getattr(np, name) for kind, name in _UFUNCS.items()}
+
+    pool = {}
+    values = []
+    stack = [(node, False)]
+    while stack:
+        n, ready = stack.pop()
+        kind = n.kind
+        if kind == Parser.CONST:
+            values.append((n.value, False))
+        elif kind == Parser.VAR:
+            values.append((env[n.value], False))
+        elif not ready:
+            stack.append((n, True))
+            if kind == Parser.SET:
+                stack.append((n.right, False))
+            else:
+                if n.right is not None:
+                    stack.append((n.right, False))
+                if n.left is not None:
+                    stack.append((n.left, False))
+        elif kind in ufuncs:
+            right, right_owned = values.pop()
+            left, left_owned = values.pop()
+            if np.ndim(left) == 0 and np.ndim(right) == 0:
+                values.append((ufuncs[kind](left, right), False))
+                continue
+            if kind == Parser.DIVIDE:
+                dtype = np.result_type(left, right, 1.0)
+            else:
+                dtype = np.result_type(left, right)
+            if left_owned and left.dtype == dtype:
+                out, left_owned = left, False
+            elif right_owned and right.dtype == dtype:
+                out, right_owned = right, False
+            elif pool.get(dtype):
+                out = pool[dtype].pop()
+            else:
+                out = np.empty(size, dtype)
+            ufuncs[kind](left, right, out=out)
+            if left_owned:
+                pool.setdefault(left.dtype, []).append(left)
+            if right_owned:
+                pool.setdefault(right.dtype, []).append(right)
+            values.append((out, True))
+        elif kind == Parser.SET:
+            # the value is bound from now on, so it stops being a reusable temporary
+            value = values.pop()[0]
+            env[n.left.value] = value
+            values.append((value, False))
+        elif kind == Parser.SEQ:
+            right = values.pop()
+            left, left_owned = values.pop()
+            if left_owned:
+                pool.setdefault(left.dtype, []).append(left)
+            values.append(right)
+        elif kind == Parser.EMPTY or n.left is None:
+            values.append((None, False))
+
+    result = values[-1][0]
+    if result is not None and size is not None and np.ndim(result) == 0:
+        result = np.full(size, result)
+    return result
+
+
+def _has_set(node):
+    stack = [node]
+    while stack:
+        n = stack.pop()
+        if n is not None:
+            if n.kind == Parser.SET:
+                return True
+            stack.append(n.left)
+            stack.append(n.right)
+    return False
@@ -0,0 +1,216 @@
+from .core import Lexer, Node, ParseError, Parser, ParserError, TokenLexer, set_parent
+
+
+class Fenwick:
+    # prefix sums over chunk lengths: point update, prefix and search in O(log n)
+    def __init__(self, values):
+        self.size = len(values)
+        self.tree = [0] + list(values)
+        for i in range(1, self.size + 1):
+            j = i + (i & -i)
+            if j <= self.size:
+                self.tree[j] += self.tree[i]
+
+    def add(self, i, delta):
+        i += 1
+        while i <= self.size:
+            self.tree[i] += delta
+            i += i & -i
+
+    def prefix(self, i):
+        # sum of the first i values
+        total = 0
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def find(self, offset):
+        # index of the value whose running range holds offset, clamped to the last one
+        i = 0
+        step = 1 << self.size.bit_length()
+        while step:
+            j = i + step
+            if j <= self.size and self.tree[j] <= offset:
+                i = j
+                offset -= self.tree[j]
+            step >>= 1
+        return min(i, self.size - 1)
+
+
+# Keeps a program as one chunk per statement (its text up to and including the ';'),
+# plus a trailing chunk holding whatever follows the last ';'. Each chunk is parsed on
+# its own with spans relative to the chunk, and chunk offsets come from a Fenwick tree,
+# so an edit never touches the spans of other statements. An edit inside a parenthesised
+# group that adds or removes no brackets or ';' re-lexes and re-parses just that group
+# and splices it into the statement; any other edit re-parses only the chunks it
+# overlaps. statements[i] is the EXPR/EMPTY node of chunk i, or the ParseError it raised
+# (None for a blank trailing chunk).
+class IncrementalParser:
+    def __init__(self, text=''):
+        self.chunks = []
+        self.statements = []
+        self.parens = []
+        self._replace(0, 0, _split(text))
+
+    @property
+    def text(self):
+        return ''.join(self.chunks)
+
+    def offset(self, i):
+        return self.lengths.prefix(i)
+
+    def chunk_at(self, offset):
+        return self.lengths.find(offset)
+
+    def errors(self):
+        return [(self.offset(i), error) for i, error in enumerate(self.statements) if isinstance(error, ParseError)]
+
+    def tree(self):
+        # the whole program shaped like Parser.parse builds it; statement spans stay chunk
+        # relative, but a statement's error is raised at its offset in the whole text
+        if not self.statements:
+            return None
+        for i, error in enumerate(self.statements):
+            if isinstance(error, ParseError):
+                offset = None if error.offset is None else self.offset(i) + error.offset
+                raise type(error)(str(error), offset) from None
+        nodes = [node for node in self.statements if node is not None]
+        if not nodes:
+            # only blanks and no ';', so the one chunk is the whole text
+            raise ParserError('"(" expected', len(self.chunks[0]))
+        node = nodes[0]
+        for statement in nodes[1:]:
+            node = Node(Parser.SEQ, left=node, right=statement)
+        return Node(Parser.PROG, left=node)
+
+    def edit(self, start, end, text):
+        first = self.chunk_at(start)
+        last = self.chunk_at(max(start, end - 1))
+        base = self.offset(first)
+        if first == last and self._edit_group(first, start - base, end - base, text):
+            return
+        old = ''.join(self.chunks[first:last + 1])
+        region = old[:start - base] + text + old[end - base:]
+        # text after the region's last ';' belongs to the next statement
+        while not region.endswith(';') and last + 1 < len(self.chunks):
+            last += 1
+            region += self.chunks[last]
+        chunks = _split(region)
+        if last + 1 < len(self.chunks):
+            # the region ends on a ';', so its empty trailing piece is not the document's
+            chunks.pop()
+        self._replace(first, last + 1, chunks)
+
+    def _replace(self, first, stop, chunks):
+        parsed = [_parse_statement(chunk) for chunk in chunks]
+        count = len(self.chunks)
+        self.chunks[first:stop] = chunks
+        self.statements[first:stop] = [p[0] for p in parsed]
+        self.parens[first:stop] = [p[1] for p in parsed]
+        if len(self.chunks) == count:
+            for i in range(first, first + len(chunks)):
+                self.lengths.add(i, len(self.chunks[i]) - self.lengths.prefix(i + 1) + self.lengths.prefix(i))
+        else:
+            self.lengths = Fenwick([len(chunk) for chunk in self.chunks])
+
+    def _edit_group(self, i, start, end, text):
+        statement = self.statements[i]
+        if statement is None or isinstance(statement, ParseError):
+            return False
+        chunk = self.chunks[i]
+        if any(c in '();' for c in text) or any(c in '();' for c in chunk[start:end]):
+            return False
+        # innermost group whose brackets both survive the edit
+        group = None
+        for g in self.parens[i]:
+            if g[0] < start and end < g[1] and (group is None or g[1] - g[0] < group[1] - group[0]):
+                group = g
+        if group is None:
+            return False
+        g_start, g_end, old = group
+        delta = len(text) - (end - start)
+        inner = chunk[g_start + 1:start] + text + chunk[end:g_end - 1]
+        try:
+            parser = Parser(TokenLexer(Lexer(inner).tokenize()), spans=True)
+            parser.lexer.next_tok()
+            new = parser.expr()
+            if parser.lexer.sym != Lexer.EOF:
+                return False
+        except ParseError:
+            return False
+        _shift(new, g_start + 1)
+        new.start = g_start
+        new.end = g_end + delta
+        # groups nested in the old subtree go, the new ones come in, the rest shift
+        groups = []
+        for s, e, node in self.parens[i]:
+            if g_start < s and e < g_end:
+                continue
+            if node is old:
+                node = new
+            groups.append((s + delta if s >= g_end else s, e + delta if e >= g_end else e, node))
+        groups.extend((s + g_start + 1, e + g_start + 1, node) for s, e, node in parser.parens)
+        for s, e, node in groups:
+            # ((x)) records x once per bracket pair; its span is the outermost pair
+            if node is new and s < new.start:
+                new.start = s
+                new.end = e
+        _shift_after(statement, old, g_end, delta)
+        parent = old.parent
+        if parent.left is old:
+            parent.left = new
+        else:
+            parent.right = new
+        set_parent(new, parent)
+        while parent is not None:
+            parent.digest = None
+            parent = parent.parent
+        self.parens[i] = groups
+        self.chunks[i] = chunk[:start] + text + chunk[end:]
+        self.lengths.add(i, delta)
+        return True
+
+
+def _split(text):
+    # one chunk per ';' plus the trailing text; every ';' character is a SEMICOLON token
+    pieces = text.split(';')
+    return [piece + ';' for piece in pieces[:-1]] + [pieces[-1]]
+
+
+def _parse_statement(chunk):
+    if not chunk.strip():
+        return None, []
+    try:
+        parser = Parser(TokenLexer(Lexer(chunk).tokenize()), spans=True)
+        parser.lexer.next_tok()
+        node = parser._statement()
+    except ParseError as e:
+        return e, []
+    set_parent(node)
+    return node, parser.parens
+
+
+def _shift(root, delta):
+    stack = [root]
+    while stack:
+        n = stack.pop()
+        if n is not None:
+            n.start += delta
+            n.end += delta
+            stack.append(n.left)
+            stack.append(n.right)
+
+
+def _shift_after(root, old, position, delta):
+    # moves the spans of the nodes at or past position and stretches the ones around old
+    stack = [root]
+    while stack:
+        n = stack.pop()
+        if n is None or n is old or n.end <= old.start:
+            continue
+        if n.start >= position:
+            n.start += delta
+        n.end += delta
+        stack.append(n.left)
+        stack.append(n.right)
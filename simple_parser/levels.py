@@ -0,0 +1,32 @@
+from collections import deque
+
+
+# one printed list of node kinds per tree level, with '$' for each missing child
+def print_tree(root):
+    buf = deque()
+    output = []
+    if not root:
+        print('$')
+    else:
+        buf.append(root)
+        count, next_count = 1, 0
+        while count:
+            node = buf.popleft()
+            if node:
+                output.append(node.kind)
+                count -= 1
+                for n in (node.left, node.right):
+                    if n:
+                        buf.append(n)
+                        next_count += 1
+                    else:
+                        buf.append(None)
+            else:
+                output.append('$')
+            if not count:
+                print(output)
+                output = []
+                count, next_count = next_count, 0
+        # print the remaining all empty leaf node part
+        output.extend(['$'] * len(buf))
+        print(output)
@@ -0,0 +1,113 @@
+from hashlib import blake2b
+
+from .core import Node, _replaced
+
+DIGEST_SIZE = 16
+
+_NONE = bytes(DIGEST_SIZE)
+
+
+# Structural fingerprint: a digest of (kind, value, left digest, right digest), so two
+# subtrees have the same fingerprint exactly when they have the same shape, kinds and
+# values (spans, parents and other annotations do not count). A Node keeps its digest
+# in node.digest once computed, and asking again only walks the nodes that have none.
+# The in-place passes and IncrementalParser clear the digests of the nodes they
+# rewrite. Other node-like trees (StoreNode) are hashed afresh on every call.
+# Pass a dict as `digests` to get every node's digest back in it, keyed by node.
+def fingerprint(node, digests=None):
+    if digests is None:
+        digests = {}
+    digests[None] = _NONE
+    if node is None:
+        return _NONE
+    cached = isinstance(node, Node)
+    # children before parents; a node shared in a DAG is hashed once
+    stack = [(node, False)]
+    while stack:
+        n, ready = stack.pop()
+        if ready:
+            digest = blake2b(b'%a %a|' % (n.kind, n.value) + digests[n.left] + digests[n.right],
+                             digest_size=DIGEST_SIZE).digest()
+            digests[n] = digest
+            if cached:
+                n.digest = digest
+        elif n not in digests:
+            if cached and n.digest is not None:
+                digests[n] = n.digest
+                continue
+            stack.append((n, True))
+            stack.append((n.right, False))
+            stack.append((n.left, False))
+    return digests[node]
+
+
+def tree_equal(a, b):
+    return a is b or fingerprint(a) == fingerprint(b)
+
+
+# Rebuilds Node trees so that equal subtrees, within one tree and across all of them,
+# are one shared node: the first one seen. Pass the same table to later calls to keep
+# sharing with trees deduplicated before. A node is kept as it is when its children
+# are, so the input trees are not modified and the results are DAGs like Interner's.
+def dedup(trees, table=None):
+    if table is None:
+        table = {}
+    results = []
+    for tree in trees:
+        digests = {}
+        fingerprint(tree, digests)
+        stack = [(tree, False)]
+        done = []
+        while stack:
+            n, ready = stack.pop()
+            if n is None:
+                done.append(None)
+            elif not ready:
+                same = table.get(digests[n])
+                if same is not None:
+                    done.append(same)
+                else:
+                    stack.append((n, True))
+                    stack.append((n.right, False))
+                    stack.append((n.left, False))
+            else:
+                right = done.pop()
+                left = done.pop()
+                digest = digests[n]
+                if left is not n.left or right is not n.right:
+                    n = _replaced(n, left, right)
+                    n.digest = digest
+                table[digest] = n
+                done.append(n)
+        results.append(done[0])
+    return results
+
+
+# The topmost pairs of subtrees that differ between two Node trees, as (path, a, b)
+# with path the 'left'/'right' steps from the roots; subtrees with equal fingerprints
+# are skipped without being walked. A missing child is None on its side.
+def diff(a, b):
+    digests = {}
+    fingerprint(a, digests)
+    fingerprint(b, digests)
+    out = []
+    # a trail is (trail of the parent, step), unrolled into a path only for the output
+    stack = [(None, a, b)]
+    while stack:
+        trail, x, y = stack.pop()
+        if x is y or x is not None and y is not None and digests[x] == digests[y]:
+            continue
+        if x is None or y is None or x.kind != y.kind or x.value != y.value:
+            out.append((_path(trail), x, y))
+            continue
+        stack.append(((trail, 'right'), x.right, y.right))
+        stack.append(((trail, 'left'), x.left, y.left))
+    return out
+
+
+def _path(trail):
+    steps = []
+    while trail is not None:
+        trail, step = trail
+        steps.append(step)
+    return tuple(reversed(steps))
@@ -0,0 +1,221 @@
+from .core import Node, Parser, _shared_nodes, _update_height, find_gcd
+
+_CHAINS = {
+    Parser.ADD: Parser.ADD,
+    Parser.SUB: Parser.ADD,
+    Parser.MULTIPLY: Parser.MULTIPLY,
+    Parser.DIVIDE: Parser.MULTIPLY,
+}
+
+
+# An ADD node is a whole +/- chain: children are its terms in order and flags[i] is True
+# for a subtracted term. A MULTIPLY node is a * and / chain the same way, flags[i] being
+# True for a divisor (division is true division, so terms can be regrouped as long as no
+# new divisor appears, see _balanced). Other kinds keep their binary children as
+# [left, right] with flags None, and leaves have no children.
+# source is the binary node this one stands for when they have the same shape, which lets
+# unflatten hand back the input's own subtrees where nothing changed.
+class NaryNode:
+    __slots__ = ('kind', 'value', 'children', 'flags', 'source')
+
+    def __init__(self, kind=None, value=None, children=None, flags=None, source=None):
+        self.kind = kind
+        self.value = value
+        self.children = [] if children is None else children
+        self.flags = flags
+        self.source = source
+
+    def __repr__(self):
+        return 'NaryNode({!r}, {!r}, {} children)'.format(self.kind, self.value, len(self.children))
+
+
+# Builds the n-ary form of a binary tree in one walk. Chains are gathered through nodes
+# of either kind on both sides, so a - (b - c) becomes a - b + c, except that a division
+# in a divisor stays one term: x / (a / b) as x / a * b would no longer divide by b. Like
+# simplify, nodes shared in a DAG are converted once, stay shared, and are not flattened
+# through.
+def flatten(node):
+    if node is None:
+        return None
+    shared = _shared_nodes(node)
+    memo = {}
+    stack = [(node, None)]
+    done = []
+    while stack:
+        n, terms = stack.pop()
+        if n is None:
+            done.append(None)
+        elif n.kind == Parser.VAR or n.kind == Parser.CONST:
+            done.append(NaryNode(n.kind, n.value, source=n))
+        elif terms is None:
+            if n in memo:
+                done.append(memo[n])
+                continue
+            if n.kind in _CHAINS:
+                terms = _chain_terms(n, shared)
+            else:
+                terms = [(n.left, False), (n.right, False)]
+            stack.append((n, terms))
+            for term in reversed(terms):
+                stack.append((term[0], None))
+        else:
+            children = done[-len(terms):]
+            del done[-len(terms):]
+            if n.kind not in _CHAINS:
+                result = NaryNode(n.kind, n.value, children, source=n)
+            else:
+                result = NaryNode(_CHAINS[n.kind], None, children, [flag for _, flag in terms])
+                if len(terms) == 2:
+                    result.source = n
+            if n in shared:
+                memo[n] = result
+            done.append(result)
+    return done[0]
+
+
+def _chain_terms(node, shared):
+    # operands of the chain under node with their flags, left to right
+    kind = _CHAINS[node.kind]
+    inverse = Parser.SUB if kind == Parser.ADD else Parser.DIVIDE
+    terms = []
+    stack = [(node, False)]
+    while stack:
+        n, flag = stack.pop()
+        if n is not node and n in shared or _CHAINS.get(n.kind) != kind or flag and n.kind == Parser.DIVIDE:
+            terms.append((n, flag))
+        else:
+            stack.append((n.right, flag != (n.kind == inverse)))
+            stack.append((n.left, flag))
+    return terms
+
+
+# Back to a binary tree, each chain built balanced: neighbouring terms are paired level
+# by level, the shallowest first, so a chain of k leaves comes out ceil(log2 k) deep and a
+# deep term is not pushed further down by the shallow ones around it. Term order is kept,
+# and a pair takes its left term's flag (-a - b is -(a + b), -a + b is -(a - b)). Parts
+# that did not change are the input's own nodes. Heights are filled in on the result,
+# shared nodes included, as minimize_tree does.
+def unflatten(nary):
+    if nary is None:
+        return None
+    memo = {}
+    stack = [(nary, False)]
+    done = []
+    while stack:
+        n, ready = stack.pop()
+        if n is None:
+            done.append(None)
+        elif not n.children:
+            result = Node(n.kind, n.value) if n.source is None else n.source
+            result.height = 1
+            done.append(result)
+        elif not ready:
+            if n in memo:
+                done.append(memo[n])
+                continue
+            stack.append((n, True))
+            for child in reversed(n.children):
+                stack.append((child, False))
+        else:
+            children = done[-len(n.children):]
+            del done[-len(n.children):]
+            source = n.source
+            if source is not None and source.left is children[0] and source.right is children[-1]:
+                result = source
+                _update_height(result)
+            elif n.flags is None:
+                result = Node(n.kind, n.value, children[0], children[1])
+                _update_height(result)
+            else:
+                result = _balanced(n.kind, children, n.flags)
+            memo[n] = result
+            done.append(result)
+    return done[0]
+
+
+# Each round pairs neighbours that are both at most `level` high, left to right; a term
+# left without a partner waits for the next round, which starts at the lowest height
+# still above `level`. In a product a divisor is never paired with a multiplier after it:
+# x / a * b as x / (a / b) divides by zero when b is zero and the input did not. Two
+# divisors become a * b and a multiplier with a divisor a / b, which only divide by zero
+# where the input did. A chain starting with a flagged term gets a leading 0 or 1, so the
+# first term can always pair and every chain comes out as one node.
+def _balanced(kind, children, flags):
+    inverse = Parser.SUB if kind == Parser.ADD else Parser.DIVIDE
+    if len(children) == 2 and not flags[0]:
+        node = Node(inverse if flags[1] else kind, None, children[0], children[1])
+        _update_height(node)
+        return node
+    terms = list(zip(children, flags))
+    if flags[0]:
+        identity = Node(Parser.CONST, 0 if kind == Parser.ADD else 1)
+        identity.height = 1
+        terms.insert(0, (identity, False))
+    product = kind == Parser.MULTIPLY
+    level = min(child.height for child, _ in terms)
+    while len(terms) > 1:
+        paired = []
+        i = 0
+        while i < len(terms):
+            left, flag = terms[i]
+            if (i + 1 < len(terms) and left.height <= level and terms[i + 1][0].height <= level
+                    and not (product and flag and not terms[i + 1][1])):
+                right, right_flag = terms[i + 1]
+                node = Node(kind if flag == right_flag else inverse, None, left, right)
+                _update_height(node)
+                paired.append((node, flag))
+                i += 2
+            else:
+                paired.append(terms[i])
+                i += 1
+        terms = paired
+        level = min((node.height for node, _ in terms if node.height > level), default=level + 1)
+    return terms[0][0]
+
+
+# same_tree across whole sums: the constant terms of each ADD node with a common factor
+# g > 1 are replaced by one term (c1/g +- c2/g ...) * g where the first constant was.
+# Rewrites the n-ary tree in place; a sum with fewer than two constants is left alone.
+def factor_gcd(nary, stats=None):
+    factorings = 0
+    seen = set()
+    stack = [nary]
+    while stack:
+        n = stack.pop()
+        if n is None or n in seen:
+            continue
+        seen.add(n)
+        if n.kind == Parser.ADD:
+            factorings += _factor_sum(n)
+        stack.extend(n.children)
+    if stats is not None:
+        stats.count('gcd_factorings', factorings)
+    return nary
+
+
+def _factor_sum(n):
+    positions = [i for i, child in enumerate(n.children) if child.kind == Parser.CONST]
+    if len(positions) < 2:
+        return 0
+    gcd = 0
+    for i in positions:
+        gcd = find_gcd(gcd, n.children[i].value)
+    if gcd <= 1:
+        return 0
+    first = positions[0]
+    negated = n.flags[first]
+    # the first constant keeps a + inside the brackets; its sign goes on the new term
+    factors = NaryNode(Parser.ADD, None, [NaryNode(Parser.CONST, n.children[i].value // gcd) for i in positions],
+                       [n.flags[i] != negated for i in positions])
+    term = NaryNode(Parser.MULTIPLY, None, [factors, NaryNode(Parser.CONST, gcd)], [False, False])
+    merged = set(positions[1:])
+    n.children[first] = term
+    n.children = [child for i, child in enumerate(n.children) if i not in merged]
+    n.flags = [flag for i, flag in enumerate(n.flags) if i not in merged]
+    n.source = None
+    return 1
+
+
+# minimize_tree's job in two walks instead of repeated rotations
+def balance(node):
+    return unflatten(flatten(node))
@@ -0,0 +1,273 @@
+from .core import Node, Parser, _height, _minimized, find_gcd, set_height, simplify
+
+# fields every node has from the start
+_NODE_FIELDS = frozenset({'kind', 'value', 'left', 'right'})
+
+_FOLD = {
+    Parser.ADD: lambda a, b: a + b,
+    Parser.SUB: lambda a, b: a - b,
+    Parser.MULTIPLY: lambda a, b: a * b,
+}
+
+
+# A pass says what it reads and writes. 'tree' in writes means it may return new nodes;
+# other names are node fields it fills in ('parent', 'height'). A local pass looks at one
+# node once its children are finished, so any run of local passes can share a single
+# post-order walk: visit(node, make) returns the node or a replacement built with make().
+# annotate(node) fills fields in on a finished node. Passes that are not local see the
+# whole tree in run(root, valid, stats), valid being the fields already filled in
+# everywhere, and get a walk of their own.
+class Pass:
+    reads = frozenset()
+    writes = frozenset()
+    local = True
+
+    def visit(self, node, make):
+        return node
+
+    def annotate(self, node):
+        pass
+
+    def run(self, root, valid, stats=None):
+        return _walk(root, [self])
+
+    def finish(self, root, stats=None):
+        pass
+
+    def rewrites(self):
+        return 'tree' in self.writes
+
+
+class ParentLinks(Pass):
+    writes = frozenset({'parent'})
+
+    def annotate(self, node):
+        if node.left is not None:
+            node.left.parent = node
+        if node.right is not None:
+            node.right.parent = node
+
+    def finish(self, root, stats=None):
+        root.parent = None
+
+
+class Heights(Pass):
+    writes = frozenset({'height'})
+
+    def annotate(self, node):
+        node.height = 1 + max(_height(node.left), _height(node.right))
+
+
+# +, -, * of two constants, and / when it divides exactly
+class FoldConstants(Pass):
+    reads = frozenset({'kind', 'value'})
+    writes = frozenset({'tree'})
+
+    def visit(self, node, make):
+        left = node.left
+        right = node.right
+        if left is None or right is None or left.kind != Parser.CONST or right.kind != Parser.CONST:
+            return node
+        fold = _FOLD.get(node.kind)
+        if fold is not None:
+            return make(Parser.CONST, fold(left.value, right.value))
+        if node.kind == Parser.DIVIDE and right.value != 0 and left.value % right.value == 0:
+            return make(Parser.CONST, left.value // right.value)
+        return node
+
+
+# same_tree as a local pass
+class FactorGcd(Pass):
+    reads = frozenset({'kind', 'value'})
+    writes = frozenset({'tree'})
+
+    def __init__(self):
+        self.factorings = 0
+
+    def visit(self, node, make):
+        if node.kind != Parser.ADD and node.kind != Parser.SUB:
+            return node
+        left = node.left
+        right = node.right
+        if left.kind != Parser.CONST or right.kind != Parser.CONST:
+            return node
+        gcd = find_gcd(left.value, right.value)
+        if gcd <= 1:
+            return node
+        self.factorings += 1
+        factors = make(node.kind, None, make(Parser.CONST, left.value // gcd), make(Parser.CONST, right.value // gcd))
+        return make(Parser.MULTIPLY, None, factors, make(Parser.CONST, gcd))
+
+    def finish(self, root, stats=None):
+        if stats is not None:
+            stats.count('gcd_factorings', self.factorings)
+        self.factorings = 0
+
+
+class Simplify(Pass):
+    writes = frozenset({'tree'})
+    local = False
+
+    def run(self, root, valid, stats=None):
+        return simplify(root)
+
+
+# minimize_tree, skipping its height walk when the heights are filled in already
+class Minimize(Pass):
+    reads = frozenset({'height'})
+    writes = frozenset({'tree', 'height'})
+    local = False
+
+    def run(self, root, valid, stats=None):
+        if 'height' not in valid:
+            set_height(root)
+        return _minimized(root, stats)
+
+
+# Runs passes in order, fusing each run of local passes into one walk. The walk is
+# path-copying like the passes in core: a node whose children came back changed is
+# rebuilt, and untouched subtrees are shared with the input (their fields are written
+# all the same). Nodes built by a rewriting pass go through the group's later rewriters
+# and get the annotations of the whole group as they are made, so the result is the one
+# the passes give run one after another, and every node of it carries them. The fields
+# each group leaves filled in across the tree are tracked, and a group that would only
+# fill in fields that are already valid is dropped. Parent links are refused in and
+# after a group that rewrites: a subtree shared with the input has one parent slot, and
+# writing it would break the input's links. Before the first rewrite they get their own
+# walk.
+class PassManager:
+    def __init__(self, passes):
+        self.passes = list(passes)
+
+    def plan(self, valid=()):
+        return [group for group, _ in self._plan(valid)]
+
+    # [(group, fields valid when it starts)]
+    def _plan(self, valid):
+        steps = []
+        valid = set(valid)
+        rewritten = False
+        for group in self._groups():
+            rewritten = rewritten or any(p.rewrites() for p in group)
+            if rewritten and any('parent' in p.writes for p in group):
+                raise ValueError('parent links cannot be written on a tree that shares subtrees with '
+                                 'the input; run ParentLinks before the passes that rewrite')
+            if not group[0].local:
+                p = group[0]
+                steps.append((group, frozenset(valid)))
+                valid = p.writes - {'tree'} if p.rewrites() else valid | p.writes
+                continue
+            rewrites = any(p.rewrites() for p in group)
+            if not rewrites:
+                group = [p for p in group if not p.writes <= valid]
+                if not group:
+                    continue
+            fields = set().union(*(p.writes for p in group)) - {'tree'}
+            missing = set().union(*(p.reads for p in group)) - _NODE_FIELDS - valid - fields
+            if missing:
+                raise ValueError('passes read {} which nothing fills in first'.format(', '.join(sorted(missing))))
+            steps.append((group, frozenset(valid)))
+            # new nodes only carry what the group fills in as they are made
+            valid = fields if rewrites else valid | fields
+        return steps
+
+    def _groups(self):
+        groups = []
+        for p in self.passes:
+            if p.local and groups and groups[-1][0].local:
+                group = groups[-1]
+                parents = [q for q in group if 'parent' in q.writes]
+                if p.rewrites() and parents and len(parents) < len(group):
+                    # parent links taken before a rewrite are the input's, so they get a
+                    # walk of their own ahead of the rest of the group
+                    groups[-1] = parents
+                    groups.append([q for q in group if 'parent' not in q.writes])
+                    groups[-1].append(p)
+                elif p.rewrites() and parents:
+                    groups.append([p])
+                else:
+                    group.append(p)
+            else:
+                groups.append([p])
+        return groups
+
+    def run(self, root, stats=None, valid=()):
+        if root is None:
+            return None
+        steps = self._plan(valid)
+        for group, valid in steps:
+            if group[0].local:
+                root = _walk(root, group)
+            else:
+                root = group[0].run(root, valid, stats)
+            for p in group:
+                p.finish(root, stats)
+        if stats is not None:
+            stats.count('walks', len(steps))
+        return root
+
+
+def _walk(root, group):
+    rewriters = [p.visit for p in group if p.rewrites()]
+    annotators = [p.annotate for p in group if p.writes - {'tree'}]
+    if not rewriters:
+        # nothing is rebuilt: children before parents, as set_height orders them
+        order = []
+        stack = [root]
+        while stack:
+            n = stack.pop()
+            if n is not None:
+                order.append(n)
+                stack.append(n.left)
+                stack.append(n.right)
+        for n in reversed(order):
+            for annotate in annotators:
+                annotate(n)
+        return root
+
+    def build(kind, value=None, left=None, right=None):
+        node = Node(kind, value, left, right)
+        for annotate in annotators:
+            annotate(node)
+        return node
+
+    def maker(j):
+        # nodes rewriter j builds go through the rewriters after it, as a later walk would
+        # take them; children are made first, so this too runs bottom up
+        later = list(enumerate(rewriters))[j + 1:]
+
+        def make(kind, value=None, left=None, right=None):
+            node = build(kind, value, left, right)
+            for k, visit in later:
+                node = visit(node, makes[k])
+            return node
+        return make
+
+    makes = [maker(j) for j in range(len(rewriters))]
+
+    stack = [(root, False)]
+    done = []
+    while stack:
+        n, ready = stack.pop()
+        if n is None:
+            done.append(None)
+            continue
+        if ready:
+            right = done.pop()
+            left = done.pop()
+            node = n if left is n.left and right is n.right else build(n.kind, n.value, left, right)
+        elif n.left is None and n.right is None:
+            # leaves are finished at once instead of going around the stack again
+            node = n
+        else:
+            stack.append((n, True))
+            stack.append((n.right, False))
+            stack.append((n.left, False))
+            continue
+        for visit, make in zip(rewriters, makes):
+            node = visit(node, make)
+        if node is n:
+            for annotate in annotators:
+                annotate(node)
+        done.append(node)
+    return done[0]
@@ -0,0 +1,111 @@
+import re
+from collections import namedtuple
+from itertools import accumulate
+from operator import sub
+
+from .core import Lexer
+
+# ok, and for a syntax error the offset in the text and the message parse() would raise
+Status = namedtuple('Status', 'ok offset message')
+
+OK = Status(True, None, None)
+
+_OPERATORS = frozenset({Lexer.PLUS, Lexer.MINUS, Lexer.MULT, Lexer.DIVIDE})
+
+# ASCII text as one class letter per character: N digit, I letter, o operator, ' ' blank,
+# ? anything the lexer rejects; the other symbols stand for themselves
+_CLASSES = {c: '?' for c in range(128)}
+_CLASSES.update((c, ' ') for c in range(128) if chr(c).isspace())
+_CLASSES.update((ord(c), 'N') for c in '0123456789')
+_CLASSES.update((ord(c), 'I') for c in 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ')
+_CLASSES.update((ord(c), 'o') for c in '+-*/')
+_CLASSES.update((ord(c), c) for c in '()=;')
+
+_LEX_ERROR = re.compile(r'\?|II')
+_NUMBER = re.compile(r'N+')
+# the grammar over one class letter per token, brackets aside: an operand may open
+# brackets and, where an expression begins, be preceded by assignments to variables
+_PROGRAM = re.compile(r'(?:;|(?:I=|\()*[IN]\)*(?:o(?:\((?:I=|\()*)?[IN]\)*)*;)+')
+# '(' counts 2, ')' 0 and everything else 1, so depth is the running sum less the count
+_DEPTH = bytes(2 if c == ord('(') else 0 if c == ord(')') else 1 for c in range(256))
+
+
+# Checks source against the grammar parse() accepts without building anything. ASCII
+# text goes through a few whole-string passes (classes, a regular expression for the
+# token order, bracket depth per statement) and is accepted there. Anything else, and
+# every rejected text, is tokenized and walked token by token the way Parser._expr
+# moves, which finds the same error parse() would raise, at the same offset.
+def recognize(source):
+    if isinstance(source, str) and source.isascii() and _accepts(source):
+        return OK
+    tokens = Lexer(source).tokenize()
+    status = _walk(tokens)
+    error = tokens.error
+    if error is not None and status.offset == error.offset:
+        # the walk got as far as the bad token, where parse() stops on the LexerError
+        return Status(False, error.offset, str(error))
+    return status
+
+
+def _accepts(text):
+    classes = text.translate(_CLASSES)
+    if _LEX_ERROR.search(classes):
+        return False
+    classes = _NUMBER.sub('N', classes).replace(' ', '')
+    if not _PROGRAM.fullmatch(classes):
+        return False
+    if '(' not in classes and ')' not in classes:
+        return True
+    for statement in classes.split(';'):
+        if statement.count('(') != statement.count(')'):
+            return False
+        if ')' in statement:
+            depths = accumulate(statement.encode('ascii').translate(_DEPTH))
+            if min(map(sub, depths, range(1, len(statement) + 1))) < 0:
+                return False
+    return True
+
+
+def _walk(tokens):
+    syms = tokens.syms
+    offsets = tokens.offsets
+    i = 0
+    while True:
+        if syms[i] != Lexer.SEMICOLON:
+            # depth counts open brackets; start is True where an expression begins, the
+            # only place a = may follow a variable
+            depth = 0
+            start = True
+            while True:
+                sym = syms[i]
+                if sym == Lexer.ID:
+                    i += 1
+                    if start and syms[i] == Lexer.EQUAL:
+                        i += 1
+                        continue
+                elif sym == Lexer.NUM:
+                    i += 1
+                elif sym == Lexer.LPAR:
+                    depth += 1
+                    i += 1
+                    start = True
+                    continue
+                else:
+                    return Status(False, offsets[i], '"(" expected')
+                # a complete term: brackets it closes, then an operator or the end
+                while depth and syms[i] == Lexer.RPAR:
+                    depth -= 1
+                    i += 1
+                if syms[i] in _OPERATORS:
+                    i += 1
+                    start = False
+                    continue
+                if depth:
+                    return Status(False, offsets[i], '")" expected')
+                break
+            if syms[i] != Lexer.SEMICOLON:
+                return Status(False, offsets[i], '";" expected')
+        i += 1
+        if syms[i] == Lexer.EOF:
+            # the last token is the bad one when tokens has an error
+            return OK if tokens.error is None else Status(False, offsets[i], None)
@@ -0,0 +1,134 @@
+_KIND_NAMES = ['VAR', 'CONST', 'ADD', 'SUB', 'MULTIPLY', 'DIVIDE', 'SET', 'EMPTY', 'EXPR', 'PROG', 'SEQ']
+
+# Node.__str__ switches to a cut-down picture above this many nodes
+RENDER_MAX_NODES = 5000
+
+
+# Draws the same picture as the old recursive box builder in linear time: one pass lays
+# out box widths bottom up, one places every box at an absolute column top down, and
+# rows are then written level by level, so no line is copied once per enclosing box.
+# Rows come back joined, or go to `file` one at a time. Nodes deeper than max_depth show
+# as '...'; with max_nodes a larger tree is cut at the deepest level that fits.
+def render_tree(root, file=None, max_nodes=None, max_depth=None, index=False, delimiter='-', curr_index=0):
+    if max_nodes is not None:
+        depth = _fitting_depth(root, max_nodes)
+        if depth is not None and (max_depth is None or depth < max_depth):
+            max_depth = depth
+    rows = _render_rows(_layout(root, curr_index, max_depth, index, delimiter))
+    if file is None:
+        return '\n'.join(rows)
+    for row in rows:
+        file.write(row)
+        file.write('\n')
+
+
+def _fitting_depth(root, max_nodes):
+    # the number of levels holding at most max_nodes nodes, or None if the whole tree does
+    level = [root] if root is not None else []
+    depth = 0
+    total = 0
+    while level:
+        total += len(level)
+        if total > max_nodes:
+            return max(depth, 1)
+        level = [child for n in level for child in (n.left, n.right) if child is not None]
+        depth += 1
+    return None
+
+
+def _layout(root, curr_index, max_depth, index, delimiter):
+    # boxes in pre-order, so a reversed walk sees children first and each level is left to right
+    labels = []
+    depths = []
+    lefts = []
+    rights = []
+    stack = [(root, 0, curr_index, -1, False)]
+    while stack:
+        n, depth, heap, parent, is_right = stack.pop()
+        if n is None:
+            continue
+        k = len(labels)
+        if parent >= 0:
+            if is_right:
+                rights[parent] = k
+            else:
+                lefts[parent] = k
+        if max_depth is not None and depth >= max_depth:
+            label = '...'
+        else:
+            label = n.value if n.kind == 0 or n.kind == 1 else _KIND_NAMES[n.kind]
+            if index:
+                label = '{}{}{}'.format(heap, delimiter, label)
+            stack.append((n.right, depth + 1, 2 * heap + 2, k, True))
+            stack.append((n.left, depth + 1, 2 * heap + 1, k, False))
+        labels.append(str(label))
+        depths.append(depth)
+        lefts.append(-1)
+        rights.append(-1)
+
+    count = len(labels)
+    widths = [0] * count
+    starts = [0] * count
+    for k in range(count - 1, -1, -1):
+        left_width = 0 if lefts[k] < 0 else widths[lefts[k]]
+        right_width = 0 if rights[k] < 0 else widths[rights[k]]
+        starts[k] = left_width + 1 if left_width else 0
+        widths[k] = starts[k] + len(labels[k]) + (1 if right_width else 0) + right_width
+
+    offsets = [0] * count
+    levels = []
+    for k in range(count):
+        if lefts[k] >= 0:
+            offsets[lefts[k]] = offsets[k]
+        if rights[k] >= 0:
+            offsets[rights[k]] = offsets[k] + widths[k] - widths[rights[k]]
+        if depths[k] == len(levels):
+            levels.append([])
+        levels[depths[k]].append(k)
+    return labels, lefts, rights, widths, starts, offsets, levels
+
+
+def _render_rows(layout):
+    labels, lefts, rights, widths, starts, offsets, levels = layout
+    for level in levels:
+        line1 = []
+        line2 = []
+        end1 = end2 = 0
+        for k in level:
+            x = offsets[k]
+            label = labels[k]
+            left = lefts[k]
+            right = rights[k]
+            if left >= 0:
+                # the branch to the left child starts right of the middle of its label
+                l_root = starts[left] + (len(labels[left]) - 1) // 2 + 1
+                line1.append(' ' * (x + l_root + 1 - end1))
+                line1.append('_' * (widths[left] - l_root))
+                line2.append(' ' * (x + l_root - end2))
+                line2.append('/')
+                end2 = x + l_root + 1
+            else:
+                line1.append(' ' * (x - end1))
+            line1.append(label)
+            end1 = x + starts[k] + len(label)
+            if right >= 0:
+                r_root = starts[right] + (len(labels[right]) - 1) // 2
+                line1.append('_' * r_root)
+                end1 += r_root
+                backslash = x + widths[k] - widths[right] - 1 + r_root
+                line2.append(' ' * (backslash - end2))
+                line2.append('\\')
+                end2 = backslash + 1
+        yield ''.join(line1)
+        yield ''.join(line2)
+
+
+# compatibility wrapper: the box lines padded to full width, and its root label columns
+def _build_tree_string(root, curr_index, index=False, delimiter='-'):
+    if root is None:
+        return [], 0, 0, 0
+    layout = _layout(root, curr_index, None, index, delimiter)
+    width = layout[3][0]
+    start = layout[4][0]
+    lines = [row.ljust(width) for row in _render_rows(layout)]
+    return lines, width, start, start + len(layout[0][0]) - 1
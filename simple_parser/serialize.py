@@ -0,0 +1,123 @@
+from .core import Node, Parser
+
+MAGIC = b'SPT\x01'
+
+# record flags above the 4-bit kind
+HAS_LEFT = 0x10
+HAS_RIGHT = 0x20
+HAS_VALUE = 0x40
+
+# the flags a record of each kind must have: leaves a value, EXPR and PROG a left child,
+# EMPTY nothing, the operators, SET and SEQ both children (SET's left one a VAR)
+_LAYOUT = [HAS_VALUE, HAS_VALUE] + [HAS_LEFT | HAS_RIGHT] * 5 + [0, HAS_LEFT, HAS_LEFT, HAS_LEFT | HAS_RIGHT]
+_VARIABLES = 26
+
+
+# Binary tree format: MAGIC, the node count as a varint, then one record per node in
+# post-order. A record is a byte holding the kind and the flags, followed by the value
+# as a zigzag varint if it has one. Post-order lets the loader build every node after
+# its children with a single stack, through the same node factories Parser takes
+# (Node, TreeStore, Interner).
+def dumps(node):
+    out = bytearray()
+    count = 0
+    stack = [(node, False)]
+    while stack:
+        n, ready = stack.pop()
+        if n is None:
+            continue
+        if not ready:
+            stack.append((n, True))
+            stack.append((n.right, False))
+            stack.append((n.left, False))
+            continue
+        count += 1
+        flags = n.kind
+        if n.left is not None:
+            flags |= HAS_LEFT
+        if n.right is not None:
+            flags |= HAS_RIGHT
+        value = n.value
+        if value is None:
+            out.append(flags)
+            continue
+        out.append(flags | HAS_VALUE)
+        _put_varint(out, value << 1 if value >= 0 else (-value << 1) - 1)
+    header = bytearray(MAGIC)
+    _put_varint(header, count)
+    return bytes(header + out)
+
+
+def _put_varint(out, value):
+    while value > 0x7f:
+        out.append(value & 0x7f | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def loads(data, store=None):
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError('not a serialized tree')
+    node = Node if store is None else store.add
+    nodes = []
+    kinds = []
+    pos = len(MAGIC)
+    try:
+        count = 0
+        shift = 0
+        while True:
+            byte = data[pos]
+            pos += 1
+            count |= (byte & 0x7f) << shift
+            shift += 7
+            if not byte & 0x80:
+                break
+        for _ in range(count):
+            flags = data[pos]
+            pos += 1
+            kind = flags & 0x0f
+            if kind > Parser.SEQ or flags & 0x80:
+                raise ValueError('malformed tree data: unknown node kind or flag')
+            if flags & 0x70 != _LAYOUT[kind]:
+                raise ValueError('malformed tree data: wrong children or value for a node of kind {}'.format(kind))
+            value = None
+            if flags & HAS_VALUE:
+                byte = data[pos]
+                pos += 1
+                value = byte & 0x7f
+                shift = 7
+                while byte & 0x80:
+                    byte = data[pos]
+                    pos += 1
+                    value |= (byte & 0x7f) << shift
+                    shift += 7
+                value = value >> 1 if not value & 1 else -(value >> 1) - 1
+                if kind == Parser.VAR and not 0 <= value < _VARIABLES:
+                    raise ValueError('malformed tree data: variable {}'.format(value))
+            right = left = None
+            if flags & HAS_RIGHT:
+                right = nodes.pop()
+                kinds.pop()
+            if flags & HAS_LEFT:
+                left = nodes.pop()
+                if kinds.pop() != Parser.VAR and kind == Parser.SET:
+                    raise ValueError('malformed tree data: SET to a node that is not a VAR')
+            kinds.append(kind)
+            nodes.append(node(kind, value, left, right))
+    except IndexError:
+        raise ValueError('truncated or malformed tree data') from None
+    if len(nodes) > 1:
+        raise ValueError('malformed tree data')
+    if pos != len(data):
+        raise ValueError('trailing tree data')
+    if not nodes:
+        return None
+    return nodes[0] if store is None else store.ref(nodes[0])
+
+
+def dump(node, file):
+    file.write(dumps(node))
+
+
+def load(file, store=None):
+    return loads(file.read(), store)
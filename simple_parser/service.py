@@ -0,0 +1,217 @@
+import argparse
+import asyncio
+import base64
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from .batch import process_chunk
+
+MAX_BATCH = 64
+MAX_DELAY = 0.002
+LATENCY_WINDOW = 10000
+LINE_LIMIT = 64 * 1024 * 1024
+
+
+# Line protocol: each line a client sends is an expression and gets one reply line, in
+# order: 'ok <base64 serialized optimized tree>' or 'error <message>'. The line '!stats'
+# is answered with a JSON object of counters, latency percentiles and queue depth, and
+# a line longer than the server's limit with 'error line too long'.
+# Requests from all connections share one queue; a batcher takes whatever is waiting
+# (after at most max_delay for more to arrive, up to max_batch) and hands it to the
+# worker pool as one process_chunk call, with at most two batches per worker in flight.
+class Service:
+    def __init__(self, workers=None, max_batch=MAX_BATCH, max_delay=MAX_DELAY):
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.pool = ProcessPoolExecutor(self.workers) if self.workers else None
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.queue = asyncio.Queue()
+        self.slots = asyncio.Semaphore(2 * max(self.workers, 1))
+        self.tasks = set()
+        self.in_flight = 0
+        self.requests = 0
+        self.errors = 0
+        self.batches = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def start(self):
+        self._spawn(self.batcher())
+
+    def close(self):
+        for task in self.tasks:
+            task.cancel()
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+
+    def submit(self, text):
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((text, future, time.perf_counter()))
+        return future
+
+    def stats(self):
+        latencies = sorted(self.latencies)
+
+        def percentile(p):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 3)
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'batches': self.batches,
+            'mean_batch': round(self.requests / self.batches, 2) if self.batches else 0,
+            'queue_depth': self.queue.qsize(),
+            'in_flight': self.in_flight,
+            'latency_ms': {
+                'p50': percentile(0.5),
+                'p90': percentile(0.9),
+                'p99': percentile(0.99),
+                'max': percentile(1),
+            },
+        }
+
+    async def batcher(self):
+        while True:
+            batch = [await self.queue.get()]
+            if self.max_delay and self.queue.qsize() < self.max_batch - 1:
+                await asyncio.sleep(self.max_delay)
+            while len(batch) < self.max_batch and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            await self.slots.acquire()
+            self.in_flight += len(batch)
+            self._spawn(self.run_batch(batch))
+
+    async def run_batch(self, batch):
+        texts = [item[0] for item in batch]
+        try:
+            try:
+                results = await self._process(texts)
+            except Exception:
+                # one text at a time, so a failure only fails the request it came from
+                results = []
+                for text in texts:
+                    try:
+                        results.extend(await self._process([text]))
+                    except Exception as e:
+                        results.append((None, 'internal: {}'.format(e), None))
+        finally:
+            self.slots.release()
+            self.in_flight -= len(batch)
+        now = time.perf_counter()
+        self.batches += 1
+        for (_, future, start), result in zip(batch, results):
+            self.latencies.append(now - start)
+            self.requests += 1
+            if result[1] is not None:
+                self.errors += 1
+            if not future.done():
+                future.set_result(result)
+
+    async def _process(self, texts):
+        if self.pool is None:
+            return process_chunk(texts)
+        return await asyncio.get_running_loop().run_in_executor(self.pool, process_chunk, texts)
+
+    async def handle(self, reader, writer):
+        replies = asyncio.Queue()
+        responder = asyncio.create_task(self.respond(replies, writer))
+        try:
+            while True:
+                try:
+                    line = await reader.readuntil(b'\n')
+                except asyncio.IncompleteReadError as e:
+                    line = e.partial
+                except asyncio.LimitOverrunError:
+                    replies.put_nowait('error line too long')
+                    if not await self._skip_line(reader):
+                        break
+                    continue
+                if not line:
+                    break
+                text = line.decode('utf-8', 'replace').strip()
+                if not text:
+                    continue
+                replies.put_nowait(self.stats() if text == '!stats' else self.submit(text))
+        finally:
+            replies.put_nowait(None)
+            await responder
+            writer.close()
+
+    async def respond(self, replies, writer):
+        # replies go out in request order however the batches finish
+        while True:
+            reply = await replies.get()
+            if reply is None:
+                return
+            if isinstance(reply, str):
+                line = reply
+            elif isinstance(reply, dict):
+                line = json.dumps(reply)
+            else:
+                try:
+                    tree, error, _ = await reply
+                except Exception as e:
+                    tree, error = None, 'internal: {}'.format(e)
+                line = 'error ' + error if tree is None else 'ok ' + base64.b64encode(tree).decode('ascii')
+            writer.write(line.encode() + b'\n')
+            try:
+                await writer.drain()
+            except ConnectionError:
+                return
+
+    @staticmethod
+    async def _skip_line(reader):
+        # drops the rest of an overlong line chunk by chunk; False if the input ended first
+        while True:
+            try:
+                await reader.readuntil(b'\n')
+                return True
+            except asyncio.IncompleteReadError:
+                return False
+            except asyncio.LimitOverrunError as e:
+                await reader.readexactly(max(e.consumed, 1))
+
+    def _spawn(self, coroutine):
+        task = asyncio.create_task(coroutine)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+
+async def serve(service, host='127.0.0.1', port=8765, path=None, limit=LINE_LIMIT):
+    service.start()
+    if path is not None:
+        server = await asyncio.start_unix_server(service.handle, path, limit=limit)
+    else:
+        server = await asyncio.start_server(service.handle, host, port, limit=limit)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def main(argv=None):
+    args = argparse.ArgumentParser(description='Serve expression parsing over a line protocol.')
+    args.add_argument('--host', default='127.0.0.1')
+    args.add_argument('--port', type=int, default=8765)
+    args.add_argument('--unix', metavar='PATH', help='listen on a Unix socket instead of TCP')
+    args.add_argument('-j', '--workers', type=int, help='worker processes, 0 to parse in the event loop')
+    args.add_argument('--max-batch', type=int, default=MAX_BATCH)
+    args.add_argument('--max-delay', type=float, default=MAX_DELAY * 1000, help='batching delay in ms')
+    args.add_argument('--line-limit', type=int, default=LINE_LIMIT, help='longest request line in bytes')
+    args = args.parse_args(argv)
+
+    async def run():
+        await serve(Service(args.workers, args.max_batch, args.max_delay / 1000), args.host, args.port, args.unix,
+                    args.line_limit)
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+# Opt-in instrumentation. Passes given stats= add their counters to it and phase()
+# times a block; with memory=True tracemalloc runs while the object is open and each
+# phase also records its peak allocation above what was live when it started. Nothing
+# is measured for callers that pass no Stats.
+class Stats:
+    def __init__(self, memory=False):
+        self.phases = {}
+        self.counters = {}
+        self.memory = memory and not tracemalloc.is_tracing()
+        if self.memory:
+            tracemalloc.start()
+        self.peak = 0
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def set(self, name, value):
+        self.counters[name] = value
+
+    @contextmanager
+    def phase(self, name):
+        if self.memory:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            phase = self.phases.setdefault(name, {'seconds': 0.0, 'calls': 0})
+            phase['seconds'] += elapsed
+            phase['calls'] += 1
+            if self.memory:
+                peak = tracemalloc.get_traced_memory()[1]
+                self.peak = max(self.peak, peak)
+                phase['peak_bytes'] = max(phase.get('peak_bytes', 0), peak - base)
+
+    def close(self):
+        if self.memory:
+            tracemalloc.stop()
+            self.memory = False
+
+    def as_dict(self):
+        phases = {}
+        for name, phase in self.phases.items():
+            phases[name] = dict(phase, seconds=round(phase['seconds'], 6))
+        result = {'phases': phases, 'counters': dict(self.counters)}
+        if self.peak:
+            result['peak_bytes'] = self.peak
+        return result
+
+    def json(self):
+        return json.dumps(self.as_dict(), indent=2)
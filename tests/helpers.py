@@ -0,0 +1,74 @@
+import math
+import random
+
+from simple_parser import ParseError, parse
+from simple_parser.evaluator import environment, evaluate
+
+# Generators and comparisons shared by the test modules.
+
+ENVIRONMENTS = [environment(a=3, b=7, c=11), environment(a=0, b=2, c=0), environment(a=5, b=5, c=-2)]
+
+
+def shape(node):
+    if node is None:
+        return None
+    return node.kind, node.value, shape(node.left), shape(node.right)
+
+
+def valid_expression(rng, depth, leaves=('a', 'b', '0', '7', '12', '18', '30')):
+    # an expression parse() accepts, with assignments and redundant brackets
+    r = rng.random()
+    if depth == 0 or r < 0.2:
+        return rng.choice(leaves)
+    if r < 0.3:
+        return '(' + rng.choice('ab') + ' = ' + valid_expression(rng, depth - 1, leaves) + ')'
+    if r < 0.45:
+        return '(' + valid_expression(rng, depth - 1, leaves) + ')'
+    return valid_expression(rng, depth - 1, leaves) + rng.choice('+-*/') + valid_expression(rng, depth - 1, leaves)
+
+
+def random_expression(rng, depth):
+    # an expression over a, b and c rich in the constants simplification looks for
+    if depth == 0 or rng.random() < 0.25:
+        return str(rng.choice([0, 1, rng.randint(2, 60), rng.randint(1, 9) * 6])) if rng.random() < 0.6 \
+            else rng.choice('abc')
+    if rng.random() < 0.05:
+        return '({} = {})'.format(rng.choice('abc'), random_expression(rng, depth - 1))
+    text = '{}{}{}'.format(random_expression(rng, depth - 1), rng.choice('+-*/'), random_expression(rng, depth - 1))
+    return '(' + text + ')' if rng.random() < 0.4 else text
+
+
+def error_of(fn, *args):
+    # fn(*args), or the ParseError it raised as (type, message, offset)
+    try:
+        return fn(*args)
+    except ParseError as e:
+        return type(e), str(e), e.offset
+
+
+def value_of(tree, env):
+    try:
+        return evaluate(tree, list(env))
+    except ZeroDivisionError:
+        return ZeroDivisionError
+
+
+def same_value(x, y):
+    if x is ZeroDivisionError or y is ZeroDivisionError:
+        return x is y
+    if isinstance(x, float) and math.isnan(x):
+        return isinstance(y, float) and math.isnan(y)
+    return x == y or math.isclose(x, y, rel_tol=1e-9, abs_tol=1e-12)
+
+
+def check_values(transform, count, seed):
+    # transform(tree) evaluates like tree on random expressions in every environment
+    rng = random.Random(seed)
+    for _ in range(count):
+        text = random_expression(rng, rng.randint(1, 7)) + ';'
+        tree = parse(text)
+        result = transform(tree)
+        for env in ENVIRONMENTS:
+            expected = value_of(tree, env)
+            got = value_of(result, env)
+            assert same_value(expected, got), (text, expected, got)
@@ -0,0 +1,65 @@
+import base64
+import json
+
+import pytest
+
+from simple_parser import batch, fingerprint, loads, optimize, parse
+
+
+def run_main(tmp_path, lines, *options):
+    source = tmp_path / 'in.txt'
+    source.write_text(''.join(line + '\n' for line in lines))
+    output = tmp_path / 'out.jsonl'
+    status = batch.main([str(source), '-o', str(output)] + list(options))
+    return status, [json.loads(line) for line in output.read_text().splitlines()]
+
+
+@pytest.mark.parametrize('workers', ['0', '2'])
+def test_records_come_back_in_input_order(tmp_path, workers):
+    texts = ['{} + {} * a;'.format(i, i + 1) if i % 7 else '({};'.format(i) for i in range(200)]
+    status, records = run_main(tmp_path, texts, '-j', workers, '--chunk-size', '3')
+    assert status == 1
+    assert [record['line'] for record in records] == list(range(1, 201))
+    for text, record in zip(texts, records):
+        if 'error' in record:
+            assert record == {'line': record['line'], 'error': '")" expected', 'offset': len(text) - 1}
+        else:
+            tree = loads(base64.b64decode(record['tree']))
+            assert fingerprint(tree) == fingerprint(optimize(parse(text)))
+
+
+def test_jsonl_lines_without_an_expression_are_error_records(tmp_path):
+    lines = ['{"e": "1 + 2;"}', '{"x": "1;"}', '[1]', 'not json', '{"e": 5}', '{"e": "1 +;"}']
+    for options in ([], ['--check']):
+        status, records = run_main(tmp_path, lines, '--jsonl', 'e', '-j', '0', *options)
+        assert status == 1
+        assert [record['line'] for record in records] == [1, 2, 3, 4, 5, 6]
+        assert 'error' not in records[0]
+        assert [record['offset'] for record in records[1:]] == [None, None, None, None, 3]
+        assert records[1]['error'] == records[2]['error'] == 'no field e'
+        assert records[3]['error'].startswith('invalid JSON')
+        assert records[4]['error'] == 'field e is not a string'
+
+
+def test_check_reports_status_and_offset(tmp_path):
+    status, records = run_main(tmp_path, ['a = 1 + 2;', '1 + ;', 'ab;'], '--check', '-j', '0')
+    assert status == 1
+    assert records == [
+        {'line': 1, 'ok': True},
+        {'line': 2, 'ok': False, 'error': '"(" expected', 'offset': 4},
+        {'line': 3, 'ok': False, 'error': 'Unknown identifier: ab', 'offset': 0},
+    ]
+
+
+def test_an_unexpected_failure_only_fails_its_line(tmp_path, monkeypatch):
+    real = batch.optimize
+
+    def optimize_or_fail(tree, inplace=False):
+        if tree.left.left.value == 13:
+            raise RuntimeError('boom')
+        return real(tree, inplace=inplace)
+    monkeypatch.setattr(batch, 'optimize', optimize_or_fail)
+    status, records = run_main(tmp_path, ['1;', '13;', '2;'], '-j', '0')
+    assert status == 1
+    assert 'tree' in records[0] and 'tree' in records[2]
+    assert records[1] == {'line': 2, 'error': 'internal: RuntimeError: boom', 'offset': None}
@@ -0,0 +1,75 @@
+import pytest
+
+from simple_parser import ParseError, fingerprint, optimize, parse
+from simple_parser import cache as cache_module
+from simple_parser.cache import ParseCache
+
+
+def error_offset(fn, text):
+    with pytest.raises(ParseError) as info:
+        fn(text)
+    return info.value.offset
+
+
+def test_errors_point_into_the_callers_text():
+    for text in ('1     +     ;', '  (a  +  b ;', 'a =\n\n  ;'):
+        assert error_offset(ParseCache().parse, text) == error_offset(parse, text)
+        assert error_offset(ParseCache().optimize, text) == error_offset(parse, text)
+
+
+def test_spacing_shares_an_entry():
+    cache = ParseCache()
+    tree = cache.parse('a+1;')
+    assert cache.parse('a  +  1 ;') is tree
+    assert cache.stats()['hits'] == 1
+
+
+def test_least_recently_used_entries_go_first():
+    cache = ParseCache(max_entries=2)
+    cache.parse('a;')
+    cache.parse('b;')
+    cache.parse('a;')
+    cache.parse('c;')
+    assert 'a;' in cache and 'c;' in cache and 'b;' not in cache
+    stats = cache.stats()
+    assert (stats['entries'], stats['hits'], stats['misses'], stats['evictions']) == (2, 1, 3, 1)
+
+
+def test_entries_are_evicted_past_max_bytes():
+    cache = ParseCache()
+    cache.parse('1 + 2;')
+    size = cache.nbytes
+    cache.max_bytes = size * 3 // 2
+    cache.parse('3 + 4;')
+    assert '1 + 2;' not in cache and '3 + 4;' in cache
+    assert cache.stats()['bytes'] == size and cache.evictions == 1
+
+
+def test_optimized_trees_are_kept_only_when_asked():
+    cache = ParseCache()
+    assert cache.optimize('2 + 4;') is not cache.optimize('2 + 4;')
+    cache = ParseCache(cache_optimized=True)
+    optimized = cache.optimize('2 + 4;')
+    assert cache.optimize('2  +  4;') is optimized
+    assert fingerprint(optimized) == fingerprint(optimize(parse('2 + 4;')))
+    parsed_only = ParseCache()
+    parsed_only.parse('2 + 4;')
+    assert cache.nbytes > parsed_only.nbytes
+
+
+def test_entries_come_back_from_disk(tmp_path, monkeypatch):
+    path = str(tmp_path / 'trees')
+    cache = ParseCache(cache_optimized=True, path=path)
+    tree = cache.parse('a = 6 + 9;')
+    optimized = cache.optimize('a = 6 + 9;')
+    cache.close()
+
+    def no_parse(text):
+        raise AssertionError('parsed again: ' + text)
+    monkeypatch.setattr(cache_module, 'parse', no_parse)
+    cache = ParseCache(cache_optimized=True, path=path)
+    assert fingerprint(cache.optimize('a=6+9;')) == fingerprint(optimized)
+    assert fingerprint(cache.parse('a = 6 + 9 ;')) == fingerprint(tree)
+    stats = cache.stats()
+    assert (stats['misses'], stats['disk_hits'], stats['hits']) == (1, 1, 1)
+    cache.close()
@@ -0,0 +1,34 @@
+import io
+import json
+import sys
+
+import pytest
+
+from simple_parser import Lexer
+from simple_parser.cli import main
+
+
+def run_cli(monkeypatch, capsys, text, *argv):
+    monkeypatch.setattr(sys, 'stdin', io.TextIOWrapper(io.BytesIO(text.encode())))
+    try:
+        main(list(argv))
+        status = 0
+    except SystemExit as e:
+        status = e.code
+    return status, capsys.readouterr()
+
+
+def test_stats_count_tokens_and_nodes(monkeypatch, capsys):
+    status, out = run_cli(monkeypatch, capsys, '1 + 2 * 3; a;', '--stats')
+    stats = json.loads(out.err)
+    assert status == 0
+    assert stats['counters']['tokens'] == len(Lexer('1 + 2 * 3; a;').tokenize())
+    assert stats['counters']['nodes'] == 10
+    assert {'parse', 'minimize_tree', 'same_tree', 'render'} <= set(stats['phases'])
+
+
+@pytest.mark.parametrize('argv', [(), ('--stats',)])
+def test_errors_are_the_same_with_and_without_stats(monkeypatch, capsys, argv):
+    status, out = run_cli(monkeypatch, capsys, '1;+/2323aa', *argv)
+    assert status == 1
+    assert out.out == 'Parser error: "(" expected\n'
@@ -0,0 +1,246 @@
+import random
+
+import pytest
+
+from simple_parser import Interner, Lexer, Node, ParseError, Parser, copy, minimize_tree, parse, same_tree
+
+from tests.helpers import shape, valid_expression
+
+
+# The recursive parser and passes as they were before the explicit stacks (minimize_tree
+# with its cached heights), kept as the reference the iterative ones must agree with. The
+# parser reads the same Lexer and builds the SEQ chain for several statements like
+# parse() does.
+class RecursiveParser:
+    def __init__(self, lexer):
+        self.lexer = lexer
+
+    def error(self, msg):
+        raise ParseError(msg)
+
+    def term(self):
+        if self.lexer.sym == Lexer.ID:
+            n = Node(Parser.VAR, self.lexer.value)
+            self.lexer.next_tok()
+            return n
+        elif self.lexer.sym == Lexer.NUM:
+            n = Node(Parser.CONST, self.lexer.value)
+            self.lexer.next_tok()
+            return n
+        else:
+            return self.paren_expr()
+
+    def multiplication(self):
+        n = self.term()
+        while self.lexer.sym == Lexer.MULT or self.lexer.sym == Lexer.DIVIDE:
+            kind = Parser.MULTIPLY if self.lexer.sym == Lexer.MULT else Parser.DIVIDE
+            self.lexer.next_tok()
+            n = Node(kind, left=n, right=self.term())
+        return n
+
+    def addition(self):
+        n = self.multiplication()
+        while self.lexer.sym == Lexer.PLUS or self.lexer.sym == Lexer.MINUS:
+            kind = Parser.ADD if self.lexer.sym == Lexer.PLUS else Parser.SUB
+            self.lexer.next_tok()
+            n = Node(kind, left=n, right=self.multiplication())
+        return n
+
+    def expr(self):
+        if self.lexer.sym != Lexer.ID:
+            return self.addition()
+        n = self.addition()
+        if n.kind == Parser.VAR and self.lexer.sym == Lexer.EQUAL:
+            self.lexer.next_tok()
+            n = Node(Parser.SET, left=n, right=self.expr())
+        return n
+
+    def paren_expr(self):
+        if self.lexer.sym != Lexer.LPAR:
+            self.error('"(" expected')
+        self.lexer.next_tok()
+        n = self.expr()
+        if self.lexer.sym != Lexer.RPAR:
+            self.error('")" expected')
+        self.lexer.next_tok()
+        return n
+
+    def statement(self):
+        if self.lexer.sym == Lexer.SEMICOLON:
+            n = Node(Parser.EMPTY)
+        else:
+            n = Node(Parser.EXPR, left=self.expr())
+            if self.lexer.sym != Lexer.SEMICOLON:
+                self.error('";" expected')
+        self.lexer.next_tok()
+        return n
+
+    def parse(self):
+        self.lexer.next_tok()
+        node = self.statement()
+        while self.lexer.sym != Lexer.EOF:
+            node = Node(Parser.SEQ, left=node, right=self.statement())
+        return Node(Parser.PROG, left=node)
+
+
+def height(node):
+    return 0 if node is None else node.height
+
+
+def update_height(node):
+    node.height = 1 + max(height(node.left), height(node.right))
+
+
+def recursive_set_height(node):
+    if node is not None:
+        recursive_set_height(node.left)
+        recursive_set_height(node.right)
+        update_height(node)
+
+
+def recursive_minimize(node):
+    if node is None:
+        return
+    recursive_set_height(node)
+    return _recursive_minimize(node, {None})
+
+
+def _recursive_minimize(node, done):
+    if node in done:
+        return node
+    flag = True
+    while flag:
+        flag = False
+        pivot = node.left
+        new_type = 0
+        if pivot is not None and pivot.kind == node.kind and pivot.height - height(node.right) > 1:
+            if pivot.kind == Parser.ADD or pivot.kind == Parser.MULTIPLY:
+                new_type = pivot.kind
+            elif pivot.kind == Parser.SUB:
+                new_type = Parser.ADD
+            elif pivot.kind == Parser.DIVIDE:
+                new_type = Parser.MULTIPLY
+        if new_type != 0:
+            node.left = pivot.right
+            node.kind = new_type
+            update_height(node)
+            pivot.right = node
+            update_height(pivot)
+            node = pivot
+            flag = True
+        elif node.left not in done or node.right not in done:
+            if node.left is not None:
+                node.left = _recursive_minimize(node.left, done)
+            if node.right is not None:
+                node.right = _recursive_minimize(node.right, done)
+            update_height(node)
+            flag = True
+    done.add(node)
+    return node
+
+
+def gcd(a, b):
+    while a != 0 and b != 0:
+        if a > b:
+            a = a % b
+        else:
+            b = b % a
+    return a + b
+
+
+# gcd > 1 where the original had gcd != 1, which divided by zero on 0 + 0
+def recursive_same(node):
+    if node is None:
+        return
+    if node.kind == Parser.ADD or node.kind == Parser.SUB:
+        if node.left.kind == Parser.CONST and node.right.kind == Parser.CONST:
+            left = node.left
+            right = node.right
+            g = gcd(left.value, right.value)
+            if g > 1:
+                node.left.left = Node(Parser.CONST, value=left.value // g)
+                node.left.right = Node(Parser.CONST, value=right.value // g)
+                node.right.value = g
+                node.left.kind = node.kind
+                node.left.value = None
+                node.kind = Parser.MULTIPLY
+    node.left = recursive_same(node.left)
+    node.right = recursive_same(node.right)
+    return node
+
+
+def reference_parse(text):
+    try:
+        return RecursiveParser(Lexer(text)).parse()
+    except ParseError:
+        return ParseError
+
+
+def current_parse(text):
+    try:
+        return parse(text)
+    except ParseError:
+        return ParseError
+
+
+def random_program(rng):
+    if rng.random() < 0.3:
+        tokens = ['a', 'b', '1', '23', '+', '-', '*', '/', '=', '(', ')', ';', ' ']
+        return ''.join(rng.choice(tokens) for _ in range(rng.randint(0, 12)))
+    return ''.join(valid_expression(rng, rng.randint(0, 7)) + ';' for _ in range(rng.randint(1, 3)))
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_parse_matches_the_recursive_parser(seed):
+    rng = random.Random(seed)
+    for _ in range(2000):
+        text = random_program(rng)
+        expected = reference_parse(text)
+        got = current_parse(text)
+        if expected is ParseError or got is ParseError:
+            assert expected is got, text
+        else:
+            assert shape(got) == shape(expected), text
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_passes_match_the_recursive_passes(seed):
+    rng = random.Random(100 + seed)
+    for _ in range(2000):
+        text = ''.join(valid_expression(rng, rng.randint(1, 8)) + ';' for _ in range(rng.randint(1, 2)))
+        tree = parse(text)
+        before = shape(tree)
+        for passes, reference in ((minimize_tree, recursive_minimize), (same_tree, recursive_same)):
+            expected = shape(reference(copy(tree)))
+            assert shape(passes(tree)) == expected, (passes.__name__, text)
+            assert shape(tree) == before, (passes.__name__, text)
+            assert shape(passes(copy(tree), inplace=True)) == expected, (passes.__name__, text)
+
+
+def distinct_nodes(node):
+    seen = set()
+    stack = [node]
+    while stack:
+        n = stack.pop()
+        if n is not None and id(n) not in seen:
+            seen.add(id(n))
+            stack.append(n.left)
+            stack.append(n.right)
+    return len(seen)
+
+
+@pytest.mark.parametrize('seed', range(2))
+def test_passes_keep_interned_sharing(seed):
+    rng = random.Random(200 + seed)
+    for _ in range(500):
+        text = ''.join(valid_expression(rng, rng.randint(1, 8)) + ';' for _ in range(rng.randint(1, 2)))
+        dag = Interner().intern(parse(text))
+        for passes, reference in ((minimize_tree, recursive_minimize), (same_tree, recursive_same)):
+            result = passes(dag)
+            assert shape(result) == shape(reference(copy(dag))), (passes.__name__, text)
+
+
+def test_same_tree_factors_shared_nodes_once():
+    dag = Interner().intern(parse('(6+9)*(6+9)*(6+9)*(6+9);'))
+    # the shared 6+9 becomes (2+3)*3 once: five new nodes, none repeated per path
+    assert distinct_nodes(same_tree(dag)) <= distinct_nodes(dag) + 5
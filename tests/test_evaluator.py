@@ -0,0 +1,74 @@
+import random
+
+import pytest
+
+from simple_parser import Interner, parse
+from simple_parser.evaluator import compile_tree, environment, evaluate, evaluate_shared
+
+from tests.helpers import ENVIRONMENTS, random_expression, same_value, valid_expression
+
+
+def run(fn, tree, env):
+    # the value and the environment fn leaves behind, or ZeroDivisionError
+    env = list(env)
+    try:
+        return fn(tree, env), env
+    except ZeroDivisionError:
+        return ZeroDivisionError, None
+
+
+def same_run(x, y):
+    return same_value(x[0], y[0]) and (x[1] is None or all(map(same_value, x[1], y[1])))
+
+
+def random_program(rng):
+    # statements that assign to and read from the same variables
+    statements = []
+    for _ in range(rng.randint(1, 4)):
+        if rng.random() < 0.5:
+            statements.append(valid_expression(rng, rng.randint(0, 5), ('a', 'b', 'c', '0', '1', '7', '12')))
+        else:
+            statements.append(random_expression(rng, rng.randint(0, 5)))
+        if rng.random() < 0.2:
+            statements.append('')
+    return ';'.join(statements) + ';'
+
+
+def compiled(tree, env):
+    return compile_tree(tree)(env)
+
+
+def shared(tree, env):
+    return evaluate_shared(Interner().intern(tree), env)
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_compiled_and_shared_evaluation_match_evaluate(seed):
+    rng = random.Random(seed)
+    for _ in range(1000):
+        text = random_program(rng)
+        tree = parse(text)
+        function = compile_tree(tree)
+        dag = Interner().intern(tree)
+        for env in ENVIRONMENTS:
+            expected = run(evaluate, tree, env)
+            assert same_run(run(lambda _, env: function(env), tree, env), expected), ('compile_tree', text, env)
+            assert same_run(run(evaluate_shared, tree, env), expected), ('evaluate_shared', text, env)
+            assert same_run(run(evaluate_shared, dag, env), expected), ('evaluate_shared on a DAG', text, env)
+
+
+@pytest.mark.parametrize('text, value, assigned', [
+    ('a + (a = 5);', 8, {'a': 5}),
+    ('(a = 5) + a;', 10, {'a': 5}),
+    ('a = 2; b = a * a; a + b;', 6, {'a': 2, 'b': 4}),
+    ('c = (a = b + 1) * a;', 64, {'a': 8, 'c': 64}),
+])
+def test_assignments_are_written_back(text, value, assigned):
+    start = environment(a=3, b=7)
+    expected = list(start)
+    for name, number in assigned.items():
+        expected[ord(name) - ord('a')] = number
+    for fn in (evaluate, compiled, evaluate_shared, shared):
+        env = list(start)
+        assert fn(parse(text), env) == value, fn.__name__
+        assert env == expected, fn.__name__
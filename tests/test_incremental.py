@@ -0,0 +1,96 @@
+import random
+
+import pytest
+
+from simple_parser import Lexer, ParseError, Parser, TreeStore, parse
+from simple_parser.incremental import IncrementalParser
+
+from tests.helpers import error_of, shape
+
+PIECES = ['a', 'b', '1', '23', ' ', '+', '-', '*', '/', '=', '(', ')', ';', 'aa', '?']
+
+
+def spanned(node):
+    if node is None:
+        return None
+    return node.kind, node.value, node.start, node.end, spanned(node.left), spanned(node.right)
+
+
+def check_parents(root):
+    assert root.parent is None
+    stack = [root]
+    while stack:
+        n = stack.pop()
+        for child in (n.left, n.right):
+            if child is not None:
+                assert child.parent is n
+                stack.append(child)
+
+
+def statement(node):
+    if isinstance(node, ParseError):
+        return type(node), str(node), node.offset
+    if node is not None:
+        check_parents(node)
+    return spanned(node)
+
+
+def groups(parens):
+    return sorted((s, e, spanned(node)) for s, e, node in parens)
+
+
+def random_program(rng):
+    statements = []
+    for _ in range(rng.randint(1, 4)):
+        expr = rng.choice(['a', 'b', '7', '12'])
+        for _ in range(rng.randint(0, 4)):
+            expr = rng.choice(['({} {} {})', '{} {} {}']).format(expr, rng.choice('+-*/'), rng.choice(['a', '(b + 3)', '5']))
+        statements.append(expr + ';')
+    return ' '.join(statements)
+
+
+def random_edit(rng, text):
+    start = rng.randint(0, len(text))
+    end = min(len(text), start + rng.choice([0, 0, 1, 1, 2, 4]))
+    return start, end, ''.join(rng.choice(PIECES) for _ in range(rng.choice([0, 1, 1, 2])))
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_edits_match_a_fresh_parse(seed):
+    rng = random.Random(seed)
+    for _ in range(150):
+        text = random_program(rng)
+        incremental = IncrementalParser(text)
+        for _ in range(12):
+            start, end, insert = random_edit(rng, text)
+            text = text[:start] + insert + text[end:]
+            incremental.edit(start, end, insert)
+            fresh = IncrementalParser(text)
+            assert incremental.text == text
+            assert incremental.chunks == fresh.chunks, text
+            assert [incremental.offset(i) for i in range(len(fresh.chunks) + 1)] == \
+                [fresh.offset(i) for i in range(len(fresh.chunks) + 1)], text
+            assert list(map(statement, incremental.statements)) == list(map(statement, fresh.statements)), text
+            assert list(map(groups, incremental.parens)) == list(map(groups, fresh.parens)), text
+            errors = [(offset, statement(error)) for offset, error in incremental.errors()]
+            assert errors == [(offset, statement(error)) for offset, error in fresh.errors()], text
+            tree = error_of(incremental.tree)
+            expected = error_of(parse, text)
+            if isinstance(expected, tuple):
+                assert tree == expected, text
+            else:
+                assert shape(tree) == shape(expected), text
+
+
+def test_statement_errors_are_raised_at_their_offset_in_the_text():
+    incremental = IncrementalParser('a + 1; b * (2;')
+    expected = error_of(parse, 'a + 1; b * (2;')
+    assert error_of(incremental.tree) == expected
+    # errors() keeps them relative to the statement's chunk
+    chunk, error = incremental.errors()[0]
+    assert chunk == 6 and chunk + error.offset == expected[2]
+
+
+def test_spans_are_refused_with_a_store():
+    with pytest.raises(ValueError):
+        Parser(Lexer('a;'), TreeStore(), spans=True)
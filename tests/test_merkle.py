@@ -0,0 +1,31 @@
+from simple_parser import (Lexer, Parser, TokenLexer, TreeStore, copy, dedup, diff, fingerprint, minimize_tree,
+                           parse, same_tree, tree_equal)
+
+
+def store_parse(text):
+    return Parser(TokenLexer(Lexer(text).tokenize()), TreeStore()).parse()
+
+
+def test_inplace_passes_work_on_stores():
+    text = '1 + 2 + 3 + 4 + a; 6 + 9;'
+    expected = same_tree(minimize_tree(parse(text)))
+    root = same_tree(minimize_tree(store_parse(text), inplace=True), inplace=True)
+    assert fingerprint(root) == fingerprint(expected)
+
+
+def test_inplace_passes_clear_stale_digests():
+    tree = parse('1 + 2 + 3 + 4 + a; 6 + 9;')
+    fingerprint(tree)
+    tree = same_tree(minimize_tree(tree, inplace=True), inplace=True)
+    assert fingerprint(tree) == fingerprint(copy(tree))
+
+
+def test_dedup_and_diff_work_on_stores():
+    a, b = store_parse('1 + 2;'), store_parse('1 + 3;')
+    assert not tree_equal(a, b)
+    expected = [path for path, x, y in diff(parse('1 + 2;'), parse('1 + 3;'))]
+    assert [path for path, x, y in diff(a, b)] == expected != []
+    assert diff(a, store_parse('1 + 2;')) == []
+    c, d = dedup([a, store_parse('a * b;')])
+    assert fingerprint(c) == fingerprint(parse('1 + 2;'))
+    assert fingerprint(d) == fingerprint(parse('a * b;'))
@@ -0,0 +1,19 @@
+from simple_parser import parse
+from simple_parser.evaluator import environment, evaluate
+from simple_parser.nary import balance, factor_gcd, flatten, unflatten
+
+from tests.helpers import check_values
+
+
+def test_divisor_is_not_paired_with_a_later_multiplier():
+    tree = parse('(b-a)/a*0;')
+    env = environment(a=3, b=7)
+    assert evaluate(balance(tree), list(env)) == evaluate(tree, list(env))
+
+
+def test_balance_keeps_values():
+    check_values(balance, 3000, 0)
+
+
+def test_factor_gcd_keeps_values():
+    check_values(lambda tree: unflatten(factor_gcd(flatten(tree))), 3000, 1)
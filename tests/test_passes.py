@@ -0,0 +1,64 @@
+import random
+
+import pytest
+
+from simple_parser import copy, optimize, parse, same_tree, set_parent
+from simple_parser.merkle import fingerprint
+from simple_parser.passes import FactorGcd, FoldConstants, Heights, Minimize, ParentLinks, PassManager, Simplify
+
+from tests.helpers import valid_expression
+
+
+def parents(root):
+    links = []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        for child in (node.left, node.right):
+            if child is not None:
+                links.append((child, child.parent))
+                stack.append(child)
+    return links
+
+
+def test_parent_links_after_a_rewrite_are_refused():
+    for passes in ([FactorGcd(), ParentLinks()], [FactorGcd(), Heights(), ParentLinks()],
+                   [Simplify(), Heights(), ParentLinks()]):
+        with pytest.raises(ValueError):
+            PassManager(passes).plan()
+
+
+def test_input_parent_links_survive_a_rewrite():
+    tree = parse('(a*b)+(2+4);')
+    set_parent(tree)
+    before = parents(tree)
+    manager = PassManager([ParentLinks(), FactorGcd(), Heights()])
+    assert [len(group) for group in manager.plan()] == [1, 2]
+    result = manager.run(tree)
+    assert parents(tree) == before
+    assert all(child.parent is parent for child, parent in before)
+    assert fingerprint(result) == fingerprint(same_tree(copy(tree)))
+
+
+def test_fused_pipeline_matches_optimize():
+    text = 'a = 2 + 4 + b * 1; c = (6 + 9) * a - 0;'
+    result = PassManager([Simplify(), Minimize(), FactorGcd(), Heights()]).run(parse(text))
+    assert fingerprint(result) == fingerprint(optimize(parse(text)))
+
+
+def test_a_local_pass_runs_on_its_own():
+    tree = parse('(1 + 2) * 3 + a;')
+    assert fingerprint(FoldConstants().run(tree, frozenset())) == fingerprint(parse('9 + a;'))
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_fused_walk_matches_the_passes_run_one_after_another(seed):
+    rng = random.Random(seed)
+    local = [FoldConstants, FactorGcd, Heights]
+    for _ in range(300):
+        tree = parse(valid_expression(rng, rng.randint(1, 7)) + ';')
+        passes = [rng.choice(local)() for _ in range(rng.randint(2, 4))]
+        expected = tree
+        for p in passes:
+            expected = p.run(expected, frozenset())
+        assert fingerprint(PassManager(passes).run(tree)) == fingerprint(expected)
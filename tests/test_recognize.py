@@ -0,0 +1,43 @@
+import random
+
+import pytest
+
+from simple_parser import parse
+from simple_parser.recognize import OK, Status, recognize
+
+from tests.helpers import error_of, valid_expression
+
+PIECES = ['a', 'B', '1', '23', '+', '-', '*', '/', '=', '(', ')', ';', ' ', '\n', 'aa', '?', '_']
+LEAVES = ('a', 'b', '0', '7', '12')
+# blanks, letters, digits and symbols outside ASCII, as text and as Latin-1 bytes
+LATIN_1 = ['\x1c', '\x85', '\xa0', 'é', 'µ', '×', 'éé', '²', '³', '1²']
+
+
+def expected(source):
+    result = error_of(parse, source)
+    if isinstance(result, tuple):
+        return Status(False, result[2], result[1])
+    return OK
+
+
+def random_program(rng):
+    r = rng.random()
+    if r < 0.4:
+        pieces = PIECES + LATIN_1 if rng.random() < 0.3 else PIECES
+        return ''.join(rng.choice(pieces) for _ in range(rng.randint(0, 12)))
+    text = ''.join(valid_expression(rng, rng.randint(0, 6), LEAVES) + ';' for _ in range(rng.randint(1, 3)))
+    if r < 0.7:
+        # one small slip in an otherwise valid program
+        i = rng.randint(0, len(text))
+        text = text[:i] + rng.choice(PIECES + LATIN_1) + text[i + rng.randint(0, 1):]
+    return text
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_recognize_matches_parse(seed):
+    rng = random.Random(seed)
+    for _ in range(5000):
+        text = random_program(rng)
+        assert recognize(text) == expected(text), text
+        data = text.encode('latin-1')
+        assert recognize(data) == expected(data), data
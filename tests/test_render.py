@@ -0,0 +1,127 @@
+import io
+import random
+
+import pytest
+
+from simple_parser import Node, Parser
+from simple_parser.render import _build_tree_string, render_tree
+
+KINDS = {0: 'VAR', 1: 'CONST', 2: 'ADD', 3: 'SUB', 4: 'MULTIPLY', 5: 'DIVIDE', 6: 'SET', 7: 'EMPTY', 8: 'EXPR',
+         9: 'PROG', 10: 'SEQ'}
+
+
+# The recursive box builder the renderer replaced, as it was (SEQ added to its names),
+# kept as the reference render_tree must draw exactly.
+def reference_build(root, curr_index, index=False, delimiter='-'):
+    if root is None:
+        return [], 0, 0, 0
+    line1 = []
+    line2 = []
+    if root.kind == 0 or root.kind == 1:
+        value = root.value
+    else:
+        value = KINDS[root.kind]
+    if index:
+        node_repr = '{}{}{}'.format(curr_index, delimiter, value)
+    else:
+        node_repr = str(value)
+
+    new_root_width = gap_size = len(node_repr)
+
+    l_box, l_box_width, l_root_start, l_root_end = \
+        reference_build(root.left, 2 * curr_index + 1, index, delimiter)
+    r_box, r_box_width, r_root_start, r_root_end = \
+        reference_build(root.right, 2 * curr_index + 2, index, delimiter)
+
+    if l_box_width > 0:
+        l_root = (l_root_start + l_root_end) // 2 + 1
+        line1.append(' ' * (l_root + 1))
+        line1.append('_' * (l_box_width - l_root))
+        line2.append(' ' * l_root + '/')
+        line2.append(' ' * (l_box_width - l_root))
+        new_root_start = l_box_width + 1
+        gap_size += 1
+    else:
+        new_root_start = 0
+
+    line1.append(node_repr)
+    line2.append(' ' * new_root_width)
+
+    if r_box_width > 0:
+        r_root = (r_root_start + r_root_end) // 2
+        line1.append('_' * r_root)
+        line1.append(' ' * (r_box_width - r_root + 1))
+        line2.append(' ' * r_root + '\\')
+        line2.append(' ' * (r_box_width - r_root))
+        gap_size += 1
+    new_root_end = new_root_start + new_root_width - 1
+
+    gap = ' ' * gap_size
+    new_box = [''.join(line1), ''.join(line2)]
+    for i in range(max(len(l_box), len(r_box))):
+        l_line = l_box[i] if i < len(l_box) else ' ' * l_box_width
+        r_line = r_box[i] if i < len(r_box) else ' ' * r_box_width
+        new_box.append(l_line + gap + r_line)
+
+    return new_box, len(new_box[0]), new_root_start, new_root_end
+
+
+def reference_render(root, **options):
+    return '\n'.join(line.rstrip() for line in reference_build(root, 0, **options)[0])
+
+
+def random_tree(rng, depth):
+    if depth == 0 or rng.random() < 0.25:
+        if rng.random() < 0.5:
+            return Node(Parser.VAR, rng.randint(0, 25))
+        return Node(Parser.CONST, rng.choice([0, 7, 12, 345, 67890]))
+    kind = rng.choice([Parser.ADD, Parser.SUB, Parser.MULTIPLY, Parser.DIVIDE, Parser.SET, Parser.EXPR, Parser.SEQ])
+    left = random_tree(rng, depth - 1) if rng.random() < 0.9 else None
+    right = random_tree(rng, depth - 1) if rng.random() < 0.9 else None
+    return Node(kind, left=left, right=right)
+
+
+def cut(node, max_depth, depth=0):
+    # the tree render_tree draws for max_depth: nodes that deep become a childless '...'
+    if node is None:
+        return None
+    if depth >= max_depth:
+        return Node(Parser.VAR, '...')
+    return Node(node.kind, node.value, cut(node.left, max_depth, depth + 1), cut(node.right, max_depth, depth + 1))
+
+
+def levels(node):
+    sizes = []
+    level = [node]
+    while level:
+        sizes.append(len(level))
+        level = [child for n in level for child in (n.left, n.right) if child is not None]
+    return sizes
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_render_matches_the_recursive_builder(seed):
+    rng = random.Random(seed)
+    for _ in range(300):
+        tree = random_tree(rng, rng.randint(0, 8))
+        assert render_tree(tree) == reference_render(tree)
+        assert render_tree(tree, index=True, delimiter=':') == reference_render(tree, index=True, delimiter=':')
+        assert _build_tree_string(tree, 3) == reference_build(tree, 3)
+        out = io.StringIO()
+        render_tree(tree, file=out)
+        assert out.getvalue() == reference_render(tree) + '\n'
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_cut_down_trees_match_the_recursive_builder(seed):
+    rng = random.Random(10 + seed)
+    for _ in range(300):
+        tree = random_tree(rng, rng.randint(1, 8))
+        max_depth = rng.randint(1, 5)
+        assert render_tree(tree, max_depth=max_depth) == reference_render(cut(tree, max_depth))
+        max_nodes = rng.randint(1, 40)
+        sizes = levels(tree)
+        depth = len(sizes)
+        while depth > 1 and sum(sizes[:depth]) > max_nodes:
+            depth -= 1
+        assert render_tree(tree, max_nodes=max_nodes) == reference_render(cut(tree, depth))
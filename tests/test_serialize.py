@@ -0,0 +1,39 @@
+import random
+
+import pytest
+
+from simple_parser import dumps, fingerprint, loads, optimize, parse
+
+from tests.helpers import random_expression, valid_expression
+
+
+def test_round_trip():
+    tree = parse('a = 1 + 2 * b; (b - 30) / 7;;')
+    assert fingerprint(loads(dumps(tree))) == fingerprint(tree)
+
+
+def test_parsed_and_optimized_trees_load_back():
+    rng = random.Random(0)
+    for _ in range(500):
+        text = valid_expression(rng, rng.randint(0, 6)) + ';' + random_expression(rng, rng.randint(0, 6)) + ';'
+        for tree in (parse(text), optimize(parse(text))):
+            assert fingerprint(loads(dumps(tree))) == fingerprint(tree), text
+
+
+@pytest.mark.parametrize('data', [
+    b'SPT\x01\x01\x0b',              # kind 11, past SEQ
+    b'SPT\x01\x01\x8f',              # unknown flag bit
+    b'SPT\x01\x01\x42\x02',          # ADD with a value
+    b'SPT\x01\x01\x40',              # VAR whose value is missing
+    b'SPT\x01\x01\x02',              # ADD without children
+    b'SPT\x01\x01\x01',              # CONST without a value
+    b'SPT\x01\x01\x40\xc6\x01',      # VAR 99
+    b'SPT\x01\x01\x40\x01',          # VAR -1
+    b'SPT\x01\x02\x41\x02\x28',      # EXPR with only a right child
+    b'SPT\x01\x02\x41\x02\x17',      # EMPTY with a child
+    b'SPT\x01\x03\x41\x02\x41\x04\x36',  # SET to a CONST
+    b'SPT\x01\x02\x40\x02\x40\x04',  # two roots
+])
+def test_malformed_data_is_rejected(data):
+    with pytest.raises(ValueError):
+        loads(data)
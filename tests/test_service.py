@@ -0,0 +1,69 @@
+import asyncio
+import base64
+import json
+import socket
+
+from simple_parser import fingerprint, loads, optimize, parse
+from simple_parser import service as service_module
+from simple_parser.service import Service
+
+
+# Sends lines to Service.handle over a socket pair; returns the reply lines and the service.
+def exchange(data, limit=2 ** 16, **options):
+    async def run():
+        service = Service(0, **options)
+        service.start()
+        ours, theirs = socket.socketpair()
+        reader, writer = await asyncio.open_connection(sock=theirs, limit=limit)
+        handler = asyncio.create_task(service.handle(reader, writer))
+        client_reader, client_writer = await asyncio.open_connection(sock=ours)
+        client_writer.write(data)
+        client_writer.write_eof()
+        replies = (await client_reader.read()).decode().splitlines()
+        await handler
+        client_writer.close()
+        service.close()
+        return replies, service
+    return asyncio.run(run())
+
+
+def tree_of(reply):
+    assert reply.startswith('ok '), reply
+    return loads(base64.b64decode(reply[3:]))
+
+
+def test_replies_come_in_request_order():
+    texts = ['{} * (a + {});'.format(i, i) for i in range(50)]
+    replies, _ = exchange(''.join(text + '\n' for text in texts).encode(), max_delay=0.01, max_batch=8)
+    assert [fingerprint(tree_of(reply)) for reply in replies] == [fingerprint(optimize(parse(t))) for t in texts]
+
+
+def test_errors_and_stats():
+    replies, service = exchange('1 + 2;\n²;\n(3;\n\n!stats\n'.encode())
+    assert fingerprint(tree_of(replies[0])) == fingerprint(parse('3;'))
+    assert replies[1:3] == ['error Unexpected symbol: ²', 'error ")" expected']
+    assert set(json.loads(replies[3])) >= {'requests', 'errors', 'batches', 'latency_ms'}
+    # '!stats' is answered as soon as it is read, so the counters are checked afterwards
+    assert (service.stats()['requests'], service.stats()['errors']) == (3, 2)
+
+
+def test_a_failing_batch_only_fails_the_request_behind_it(monkeypatch):
+    real = service_module.process_chunk
+
+    def process_chunk(texts):
+        if '9;' in texts:
+            raise RuntimeError('boom')
+        return real(texts)
+    monkeypatch.setattr(service_module, 'process_chunk', process_chunk)
+    replies, service = exchange(b'1 + 2;\n9;\n3;\n', max_delay=0.05)
+    assert replies[0].startswith('ok ') and replies[2].startswith('ok ')
+    assert replies[1] == 'error internal: boom'
+    stats = service.stats()
+    assert (stats['requests'], stats['errors'], stats['batches']) == (3, 1, 1)
+
+
+def test_an_overlong_line_gets_an_error_and_the_connection_goes_on():
+    long_line = b'1+' * 40000 + b'1;\n'
+    replies, _ = exchange(b'1;\n' + long_line + b'2;\n' + long_line[:-1], limit=1000)
+    assert [reply.split(' ')[0] for reply in replies] == ['ok', 'error', 'ok', 'error']
+    assert replies[1] == replies[3] == 'error line too long'
@@ -0,0 +1,28 @@
+import pytest
+
+from simple_parser import fingerprint, optimize, parse, simplify
+from simple_parser.evaluator import environment, evaluate
+
+from tests.helpers import check_values
+
+
+@pytest.mark.parametrize('text', ['a/0*0;', 'a/b*0;', '0*(c/(b-b));', 'a/(1-1)*0;'])
+def test_a_division_by_zero_is_not_dropped(text):
+    env = environment(a=3, b=0)
+    with pytest.raises(ZeroDivisionError):
+        evaluate(parse(text), list(env))
+    with pytest.raises(ZeroDivisionError):
+        evaluate(simplify(parse(text)), list(env))
+
+
+def test_a_product_with_zero_folds_when_nothing_can_fail():
+    for text in ('a/2*0;', '(a+b)*0;', '(a*b-c/3)*0*c;'):
+        assert fingerprint(simplify(parse(text))) == fingerprint(parse('0;')), text
+
+
+def test_simplify_keeps_values():
+    check_values(simplify, 3000, 2)
+
+
+def test_optimize_keeps_values():
+    check_values(optimize, 3000, 3)
@@ -0,0 +1,69 @@
+import io
+
+import pytest
+
+from simple_parser import FileSource, Lexer, Parser, fingerprint, map_file, parse
+
+from tests.helpers import error_of
+
+TEXT = 'a = 12 + b;\n(c - 3) * a;\xa0d / 4;\n'
+
+
+def characters(source):
+    out = []
+    ch = source.getc()
+    while ch:
+        out.append(ch)
+        ch = source.getc()
+    return ''.join(out)
+
+
+def tokens(source):
+    found = []
+    lexer = Lexer(source)
+    lexer.next_tok()
+    while lexer.sym != Lexer.EOF:
+        found.append((lexer.sym, lexer.value, lexer.start, lexer.end))
+        lexer.next_tok()
+    return found
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 7, 1 << 16])
+def test_small_chunks_read_like_the_whole_text(chunk_size):
+    data = TEXT.encode('latin-1')
+    assert characters(FileSource(io.BytesIO(data), chunk_size)) == TEXT
+    assert tokens(FileSource(io.BytesIO(data), chunk_size)) == tokens(TEXT)
+    tree = Parser(Lexer(FileSource(io.BytesIO(data), chunk_size))).parse()
+    assert fingerprint(tree) == fingerprint(parse(TEXT))
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3])
+def test_characters_split_across_chunks_decode_whole(chunk_size):
+    # \xa0 is a blank and ² a symbol the lexer rejects, each two bytes in UTF-8
+    text = TEXT + '1 +\xa0²;'
+    f = io.TextIOWrapper(io.BytesIO(text.encode('utf-8')), encoding='utf-8')
+    assert characters(FileSource(f, chunk_size)) == text
+    f = io.TextIOWrapper(io.BytesIO(text.encode('utf-8')), encoding='utf-8')
+    assert error_of(Parser(Lexer(FileSource(f, chunk_size))).parse) == error_of(parse, text)
+    f = io.TextIOWrapper(io.BytesIO(text.encode('utf-8')), encoding='utf-8')
+    assert error_of(parse, FileSource(f, chunk_size)) == error_of(parse, text)
+
+
+def test_an_empty_file_maps_to_an_empty_source(tmp_path):
+    path = tmp_path / 'empty.txt'
+    path.write_bytes(b'')
+    assert characters(map_file(path)) == ''
+    assert error_of(parse, map_file(path)) == error_of(parse, '')
+
+
+def test_tokenize_reads_an_mmap_in_place(tmp_path):
+    path = tmp_path / 'program.txt'
+    path.write_bytes(TEXT.encode('latin-1'))
+    source = map_file(path)
+    assert type(source.buf).__name__ == 'mmap'
+    found = Lexer(source).tokenize()
+    expected = Lexer(TEXT).tokenize()
+    for column in ('syms', 'values', 'offsets', 'ends'):
+        assert list(getattr(found, column)) == list(getattr(expected, column)), column
+    assert fingerprint(parse(map_file(path))) == fingerprint(parse(TEXT))
+    source.buf.close()
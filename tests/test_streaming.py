@@ -0,0 +1,29 @@
+import os
+import threading
+
+from simple_parser import Parser, iter_statements
+
+
+def test_statements_from_a_text_pipe_come_out_as_each_semicolon_arrives():
+    read_end, write_end = os.pipe()
+    first_seen = threading.Event()
+    waited_out = []
+
+    def write():
+        with os.fdopen(write_end, 'w') as f:
+            f.write('1 + 2;')
+            f.flush()
+            waited_out.append(not first_seen.wait(5))
+            f.write('3;')
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    with os.fdopen(read_end, 'r') as f:
+        statements = iter_statements(f)
+        first = next(statements)
+        first_seen.set()
+        rest = list(statements)
+    writer.join()
+    assert waited_out == [False]
+    assert first.left.kind == Parser.ADD
+    assert [node.left.kind for node in rest] == [Parser.CONST]
@@ -0,0 +1,53 @@
+import math
+import random
+
+import pytest
+
+from simple_parser import parse
+from simple_parser.evaluator import environment, evaluate, evaluate_columns
+
+from tests.helpers import random_expression, value_of
+
+np = pytest.importorskip('numpy')
+
+ROWS = 16
+
+
+def check_rows(text, columns):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = evaluate_columns(parse(text), columns)
+    for i in range(ROWS):
+        row = {name: column[i].item() for name, column in columns.items()}
+        expected = value_of(parse(text), environment(**row))
+        if expected is ZeroDivisionError:
+            # NumPy gives inf or nan for these rows instead
+            continue
+        got = result[i].item()
+        assert got == expected or math.isclose(got, expected, rel_tol=1e-9), (text, row, got, expected)
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_columns_match_evaluate_row_by_row(seed):
+    rng = random.Random(seed)
+    for _ in range(300):
+        text = random_expression(rng, rng.randint(1, 5)) + ';'
+        floats = {name: np.array([rng.randint(-9, 9) for _ in range(ROWS)], dtype=float) for name in 'abc'}
+        check_rows(text, floats)
+
+
+@pytest.mark.parametrize('seed', range(2))
+def test_integer_columns_match_evaluate_row_by_row(seed):
+    rng = random.Random(10 + seed)
+    for _ in range(300):
+        # shallow enough that no product leaves int64
+        text = random_expression(rng, rng.randint(1, 3)) + ';'
+        ints = {name: np.array([rng.randint(-9, 9) for _ in range(ROWS)]) for name in 'abc'}
+        check_rows(text, ints)
+
+
+def test_bound_columns_are_not_written():
+    a = np.arange(1, ROWS + 1)
+    before = a.copy()
+    result = evaluate_columns(parse('b = a * 2; a + b / 4;'), {'a': a})
+    assert np.array_equal(a, before)
+    assert np.allclose(result, a + a * 2 / 4)